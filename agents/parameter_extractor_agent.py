@@ -28,7 +28,9 @@ class ParameterExtractorAgent:
         # BER
         # -------------------------
         if task_spec.task_type == "ber":
-            params["modulation"] = self._extract_modulation(prompt)
+            mods = self._extract_modulations(prompt)
+            # Several modulations -> one common-random-numbers comparison run
+            params["modulation"] = mods if len(mods) > 1 else mods[0]
             params["channel"] = self._extract_channel(prompt)
             params["snr_db_list"] = self._extract_snr_list(prompt)
             task_spec.parameters = params
@@ -80,6 +82,10 @@ class ParameterExtractorAgent:
                 return m
         return "qpsk"
 
+    def _extract_modulations(self, text):
+        mods = [m for m in ["qpsk", "16qam", "64qam", "256qam"] if m in text]
+        return mods or ["qpsk"]
+
     def _extract_snr(self, text, default=10):
         # matches "snr 15", "snr=15", "snr -5"
         match = re.search(r"snr\s*[=:]?\s*(-?\d+(\.\d+)?)", text)
@@ -131,6 +137,8 @@ class ParameterExtractorAgent:
         return [[0, 0, 10], [60, 0, 10], [-60, 0, 10]]
 
     def _extract_combine_mode(self, text):
+        if "sinr" in text or "best server" in text or "serving cell" in text:
+            return "sinr"
         if "sum" in text or "adding" in text or "aggregate" in text:
             return "sum"
         return "max"
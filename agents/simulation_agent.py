@@ -1,6 +1,14 @@
+import asyncio
+import dataclasses
+import shutil
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
 from core.logger import setup_logger
+from core.progress import Cancelled, ProgressContext, activate
 from core.schemas import ToolResult
-from core.local_tools import LOCAL_TOOL_REGISTRY
+from core.single_flight import SingleFlight, flight_key
+from core.local_tools import LOCAL_TOOL_REGISTRY, LOCAL_STREAM_TOOL_REGISTRY
 
 TASK_TO_TOOL = {
     "constellation": "simulate_constellation",
@@ -10,33 +18,319 @@ TASK_TO_TOOL = {
     "multi_radio_map": "simulate_multi_radio_map",
 }
 
+# Tools that can resume from stored per-SNR-point counts (core.point_store)
+POINT_STORE_TOOLS = ("simulate_ber", "simulate_ber_mimo")
+
+# Concurrent arun() calls per tool; more wait for a slot, other tools are unaffected
+TOOL_CONCURRENCY = {
+    "simulate_constellation": 4,
+    "simulate_ber": 2,
+    "simulate_ber_mimo": 1,
+    "simulate_radio_map": 2,
+    "simulate_multi_radio_map": 1,
+}
+
+class _StreamContext(ProgressContext):
+    """Flight context of a coalesced run_stream(): also holds the latest preview."""
+
+    def __init__(self, cancel_event=None):
+        super().__init__(cancel_event)
+        self._published = threading.Condition()
+        self._count = 0
+        self._latest = None
+
+    def publish(self, result):
+        with self._published:
+            self._count += 1
+            self._latest = result
+            self._published.notify_all()
+
+    def latest(self, seen=0, timeout=None):
+        """(previews published so far, newest one), waiting up to timeout for a new one."""
+        with self._published:
+            self._published.wait_for(lambda: self._count > seen, timeout)
+            return self._count, self._latest
+
+
 class SimulationAgent:
-    def __init__(self, mcp_client=None, use_mcp=False):
+    def __init__(self, mcp_client=None, use_mcp=False, worker_pool=None, result_cache=None,
+                 point_store=None, coalesce=False, tool_concurrency=None):
         self.mcp = mcp_client
         self.use_mcp = use_mcp
+        self.pool = worker_pool     # core.worker_pool.WorkerPool: warm out-of-process tools
+        self.cache = result_cache   # core.result_cache.ResultCache: skip repeated calls
+        self.point_store = point_store  # True or sqlite path: BER sweeps reuse stored points
+        # Identical concurrent requests share one computation (core.single_flight)
+        self.flights = SingleFlight() if coalesce else None
+        self.tool_concurrency = {**TOOL_CONCURRENCY, **(tool_concurrency or {})}
+        self._executor = None       # local tool calls of arun(), one thread per slot
+        self._aloop = None          # loop the semaphores / async flights belong to
+        self._semaphores = {}
+        self._aflights = {}
         self.logger = setup_logger("SimulationAgent")
 
-    def run(self, task_spec):
+    def run(self, task_spec, cancel=None, progress=None):
+        """
+        (task_spec, ToolResult). `progress` (core.progress.ProgressContext)
+        receives the tool's bits/errors per SNR point, and setting its
+        cancel_event (or `cancel`, a threading.Event) stops the tool at its
+        next Monte-Carlo batch with a "cancelled" error result.
+
+        With coalesce=True, identical concurrent calls (same task_type +
+        parameters) wait on one computation and share its result and
+        progress; a cancelled caller only leaves the wait, and the
+        computation is cancelled once every waiter has left.
+        """
         tool_name = TASK_TO_TOOL.get(task_spec.task_type)
         task_spec.tool_name = tool_name
-        params = task_spec.parameters or {}
+        params = self._tool_params(tool_name, task_spec.parameters or {})
+        ctx = progress if progress is not None else \
+            ProgressContext(cancel) if cancel is not None else None
+
+        if self.flights is None:
+            return task_spec, self._execute(tool_name, params, ctx)
 
+        key = flight_key(task_spec.task_type, params)
+        try:
+            with self.flights.join(key, lambda f: self._execute(tool_name, params, f.context),
+                                   context_factory=ProgressContext) as flight:
+                if flight.waiters > 1:
+                    self.logger.info(f"Joined in-flight {tool_name} call ({flight.waiters} waiters)")
+                if ctx is not None:
+                    ctx.follow(flight.context)
+                result = flight.result(cancel=ctx.cancel_event if ctx is not None else None)
+        except CancelledError as e:
+            self.logger.warning(f"Tool call abandoned: {e}")
+            return task_spec, ToolResult(ok=False, payload={}, error=f"cancelled: {e}")
+        except Exception as e:
+            self.logger.error(f"Tool call failed: {e}")
+            return task_spec, ToolResult(ok=False, payload={}, error=str(e))
+        # Waiters share the result; each gets its own top-level payload dict
+        return task_spec, dataclasses.replace(result, payload=dict(result.payload))
+
+    def _execute(self, tool_name, params, ctx=None):
+        """Cache -> MCP -> local tool, reporting into ctx. Returns a ToolResult."""
         self.logger.info(f"Calling tool: {tool_name} with params: {params}")
 
+        # ---- 0) Result cache ----
+        key, cached = self._cached(tool_name, params)
+        if cached is not None:
+            return ToolResult(ok=True, payload=cached)
+        if ctx is not None and ctx.cancel_event.is_set():
+            return ToolResult(ok=False, payload={}, error="cancelled before start")
+
         # ---- 1) Try MCP only if enabled ----
         if self.use_mcp and self.mcp is not None:
             result = self.mcp.call_tool(tool_name, params)
             if result.ok:
                 self.logger.info("MCP tool call success.")
-                return task_spec, result
+                return result
             self.logger.warning(f"MCP failed, falling back to local tools: {result.error}")
 
-        # ---- 2) Local tool fallback ----
+        # ---- 2) Local tool fallback (warm worker pool if configured) ----
+        return self._run_local(tool_name, params, key, ctx)
+
+    def _run_local(self, tool_name, params, key=None, ctx=None):
+        """Local tool (or worker pool) call; stored under the cache key if given."""
+        # Cached runs write into a private staging dir (no shared file names)
+        staging = self.cache.staging_dir() if key is not None else None
         try:
-            tool_fn = LOCAL_TOOL_REGISTRY[tool_name]
-            payload = tool_fn(**params)
+            call_params = params if staging is None else {**params, "out_dir": staging}
+            if self.pool is not None:
+                payload = self.pool.call(tool_name, call_params, progress=ctx)
+            else:
+                tool_fn = LOCAL_TOOL_REGISTRY[tool_name]
+                with activate(ctx):
+                    payload = tool_fn(**call_params)
+            if key is not None:
+                payload = self.cache.put(key, payload, staging)
             self.logger.info("Local tool call success.")
-            return task_spec, ToolResult(ok=True, payload=payload)
+            return ToolResult(ok=True, payload=payload)
+        except Cancelled as e:
+            if staging is not None:
+                shutil.rmtree(staging, ignore_errors=True)
+            self.logger.warning(f"Local tool call cancelled: {e}")
+            return ToolResult(ok=False, payload={}, error=f"cancelled: {e}")
         except Exception as e:
+            if staging is not None:
+                shutil.rmtree(staging, ignore_errors=True)
             self.logger.error(f"Local tool call failed: {e}")
-            return task_spec, ToolResult(ok=False, payload={}, error=str(e))
+            return ToolResult(ok=False, payload={}, error=str(e))
+
+    # ---- asyncio ----
+    async def arun(self, task_spec):
+        """
+        Async run(): (task_spec, ToolResult) without blocking the event loop.
+        MCP calls go through MCPClient.acall_tool; local tools (CPU-bound)
+        run on a thread executor, in the worker pool's processes if one is
+        configured. At most tool_concurrency[tool] calls of a tool run at
+        once, so a burst of heavy sweeps cannot take every slot. With
+        coalesce=True, identical concurrent calls await one computation.
+        """
+        tool_name = TASK_TO_TOOL.get(task_spec.task_type)
+        task_spec.tool_name = tool_name
+        params = self._tool_params(tool_name, task_spec.parameters or {})
+        self._bind_loop()
+
+        if self.flights is None:
+            return task_spec, await self._aexecute(tool_name, params)
+
+        key = flight_key(task_spec.task_type, params)
+        flight = self._aflights.get(key)
+        if flight is None:
+            flight = self._aflights[key] = asyncio.create_task(self._aexecute(tool_name, params))
+
+            def forget(f):
+                if self._aflights.get(key) is f:
+                    del self._aflights[key]
+            flight.add_done_callback(forget)
+        else:
+            self.logger.info(f"Joined in-flight {tool_name} call")
+        # A cancelled caller leaves; the shared call still completes (and is cached)
+        result = await asyncio.shield(flight)
+        return task_spec, dataclasses.replace(result, payload=dict(result.payload))
+
+    async def _aexecute(self, tool_name, params):
+        """Async _execute(): cache -> MCP -> local tool, under the tool's semaphore."""
+        loop = asyncio.get_running_loop()
+        executor = self._tool_executor()
+        key, cached = await loop.run_in_executor(executor, self._cached, tool_name, params)
+        if cached is not None:
+            return ToolResult(ok=True, payload=cached)
+
+        async with self._semaphore(tool_name):
+            self.logger.info(f"Calling tool: {tool_name} with params: {params}")
+            if self.use_mcp and self.mcp is not None:
+                result = await self.mcp.acall_tool(tool_name, params)
+                if result.ok:
+                    self.logger.info("MCP tool call success.")
+                    return result
+                self.logger.warning(f"MCP failed, falling back to local tools: {result.error}")
+            return await loop.run_in_executor(executor, self._run_local, tool_name, params, key)
+
+    def _bind_loop(self):
+        """Semaphores and async flights belong to one event loop; reset them on a new one."""
+        loop = asyncio.get_running_loop()
+        if self._aloop is not loop:
+            self._aloop, self._semaphores, self._aflights = loop, {}, {}
+
+    def _semaphore(self, tool_name):
+        sem = self._semaphores.get(tool_name)
+        if sem is None:
+            sem = self._semaphores[tool_name] = asyncio.Semaphore(
+                self.tool_concurrency.get(tool_name, 1))
+        return sem
+
+    def _tool_executor(self):
+        # One thread per concurrency slot (plus one for cache lookups): a
+        # waiting tool never lacks a thread once its semaphore lets it in
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(sum(self.tool_concurrency.values()) + 1,
+                                                thread_name_prefix="tool")
+        return self._executor
+
+    def close(self):
+        """Shuts down the arun() executor (running tool calls finish)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def run_stream(self, task_spec, cancel=None, progress=None):
+        """
+        Like run(), but yields (task_spec, ToolResult) once per preview for
+        tools with a progressive variant; other tools yield a single result.
+        Cancelling stops a progressive tool between previews.
+
+        With coalesce=True, identical concurrent streams share one
+        computation: every waiter gets the latest preview as it appears
+        (a late joiner starts from the newest one) and the final result.
+        """
+        tool_name = TASK_TO_TOOL.get(task_spec.task_type)
+        params = self._tool_params(tool_name, task_spec.parameters or {})
+        key, cached = self._cached(tool_name, params)
+        stream_fn = LOCAL_STREAM_TOOL_REGISTRY.get(tool_name) if cached is None else None
+        if stream_fn is None or (self.use_mcp and self.mcp is not None):
+            yield self.run(task_spec, cancel, progress)
+            return
+        cancel = progress.cancel_event if progress is not None else cancel
+
+        task_spec.tool_name = tool_name
+        if self.flights is None:
+            for result in self._stream_local(tool_name, params, stream_fn, key, cancel):
+                yield task_spec, result
+            return
+
+        def publish_all(flight):
+            result = None
+            for result in self._stream_local(tool_name, params, stream_fn, key,
+                                             flight.cancel_event):
+                flight.context.publish(result)
+            return result
+
+        try:
+            with self.flights.join(flight_key(task_spec.task_type, params), publish_all,
+                                   context_factory=_StreamContext) as flight:
+                if flight.waiters > 1:
+                    self.logger.info(f"Joined in-flight {tool_name} stream ({flight.waiters} waiters)")
+                if progress is not None:
+                    progress.follow(flight.context)
+                seen = 0
+                while True:
+                    if cancel is not None and cancel.is_set():
+                        raise CancelledError(f"left flight {flight.key[:12]}")
+                    done = flight.future.done()
+                    count, latest = flight.context.latest(seen, timeout=0.1)
+                    if count > seen:
+                        seen = count
+                        yield task_spec, dataclasses.replace(latest, payload=dict(latest.payload))
+                    if done:
+                        break
+                flight.result()
+        except CancelledError as e:
+            self.logger.warning(f"Tool call abandoned: {e}")
+            yield task_spec, ToolResult(ok=False, payload={}, error=f"cancelled: {e}")
+        except Exception as e:
+            self.logger.error(f"Tool call failed: {e}")
+            yield task_spec, ToolResult(ok=False, payload={}, error=str(e))
+
+    def _stream_local(self, tool_name, params, stream_fn, key=None, cancel=None):
+        """Yields a ToolResult per preview, then the cached final result if keyed."""
+        self.logger.info(f"Streaming tool: {tool_name} with params: {params}")
+        staging = self.cache.staging_dir() if key is not None else None
+        call_params = params if staging is None else {**params, "out_dir": staging}
+        try:
+            payload = None
+            for payload in stream_fn(**call_params):
+                if cancel is not None and cancel.is_set():
+                    raise Cancelled("between previews")
+                yield ToolResult(ok=True, payload=payload)
+            if key is not None and payload is not None:
+                # Final result again, now at its cached (stable) paths
+                yield ToolResult(ok=True, payload=self.cache.put(key, payload, staging))
+            self.logger.info("Local streaming tool call success.")
+        except Cancelled as e:
+            if staging is not None:
+                shutil.rmtree(staging, ignore_errors=True)
+            self.logger.warning(f"Local streaming tool call cancelled: {e}")
+            yield ToolResult(ok=False, payload={}, error=f"cancelled: {e}")
+        except Exception as e:
+            if staging is not None:
+                shutil.rmtree(staging, ignore_errors=True)
+            self.logger.error(f"Local streaming tool call failed: {e}")
+            yield ToolResult(ok=False, payload={}, error=str(e))
+
+    def _tool_params(self, tool_name, params):
+        """Extracted params plus the agent-level options the tool supports."""
+        if self.point_store and tool_name in POINT_STORE_TOOLS and "point_store" not in params:
+            params = {**params, "point_store": self.point_store}
+        return params
+
+    def _cached(self, tool_name, params):
+        """(cache key or None, cached payload or None)."""
+        if self.cache is None or tool_name is None:
+            return None, None
+        key = self.cache.key(tool_name, params)
+        payload = self.cache.get(key)
+        if payload is not None:
+            self.logger.info("Result cache hit.")
+        return key, payload
@@ -0,0 +1,89 @@
+"""
+Batch-size auto-tuning for the BER tools under a memory budget.
+
+The footprint models below are bytes per sample (one symbol for
+simulate_ber, one nt-vector channel use for simulate_ber_mimo) of the
+arrays a batch allocates, calibrated against tracemalloc peaks of the NumPy
+backend and rounded up. pick_batch_size() turns a budget into the largest
+batch that fits; warmup_refine() optionally times a few candidates below
+that cap and keeps the fastest.
+"""
+import os
+import time
+
+# Multiplier on the models: allocator slack, NumPy/TF temporaries
+SAFETY = 1.5
+MIN_BATCH = 64
+MAX_BATCH = 1 << 22
+
+
+def available_memory_mb():
+    """Free physical memory (Linux sysconf), or None if unknown."""
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def default_budget_mb():
+    """A quarter of the free memory (256 MB if unknown)."""
+    free = available_memory_mb()
+    return 256.0 if free is None else free / 4
+
+
+def ber_bytes_per_symbol(k, fading=False, demapper="app", importance_sampling=False,
+                         backend="numpy"):
+    """simulate_ber: bytes per symbol of one batch."""
+    m = 2 ** (k // 2)
+    if backend == "sionna":
+        # [B, M] distances/exponents plus the [B, k, M/2] per-bit gathers
+        return 64 + 4 * (3 * m * m + k * m * m) + (48 if fading else 0)
+    b = 80 + 12 * k
+    if fading:
+        b += 48
+    if importance_sampling:
+        b += 48
+    if demapper == "app":
+        b += 12 * m                                     # [B, m] per-axis metrics
+    return b
+
+
+def mimo_bytes_per_vector(k, nt, nr, detector="mrc", kbest_k=8, backend="numpy"):
+    """simulate_ber_mimo: bytes per channel use (one [nr, nt] channel) of one batch."""
+    ns = 1 if detector == "mrc" else nt
+    b = ns * (3 * k + 40) + nr * 20 + 4                 # per-config work buffers
+    b += nr * nt * 8 + nr * 8 + ns * 8                  # h, noise, symbol indices
+    b += ns * (4 * k + 40) + 64                         # soft demap temporaries
+    if detector in ("zf", "mmse"):
+        b += 8 * (4 * nt * nr + 6 * nt * (nt + 1))      # H^H, Gram, [H^H y | I], solve copies
+    elif detector == "kbest":
+        m = 2 ** k
+        b += 36 * kbest_k * m + 16 * kbest_k * nt       # [N, K*M] metrics, paths
+    if backend == "sionna":
+        b += 8 * (nr * nt + 2 * nr + ns) + 4 * ns * k   # TF tensors before the host copy
+    return b
+
+
+def pick_batch_size(bytes_per_sample, memory_budget_mb, rows=1, safety=SAFETY,
+                    lo=MIN_BATCH, hi=MAX_BATCH):
+    """Largest batch with rows * batch * bytes_per_sample * safety <= budget."""
+    fit = int(memory_budget_mb * 2**20 / (bytes_per_sample * rows * safety))
+    return max(lo, min(hi, fit))
+
+
+def warmup_refine(run_batch, max_batch, n_candidates=3, lo=MIN_BATCH):
+    """
+    Times run_batch(batch_size) for max_batch, max_batch/2, ... and returns
+    the batch with the best samples/s (the larger one unless >5% slower).
+    Each candidate runs twice; the first call absorbs one-off costs.
+    """
+    candidates = sorted({max(lo, max_batch >> i) for i in range(n_candidates)}, reverse=True)
+    best, best_rate = candidates[0], 0.0
+    for bs in candidates:
+        run_batch(bs)
+        t0 = time.perf_counter()
+        run_batch(bs)
+        rate = bs / max(time.perf_counter() - t0, 1e-9)
+        if rate > best_rate * 1.05:
+            best, best_rate = bs, rate
+    return best
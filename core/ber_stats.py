@@ -0,0 +1,143 @@
+"""
+Monte-Carlo bookkeeping shared by the BER tools: confidence intervals and
+the per-SNR-point stopping rule, for plain and importance-sampled counts.
+"""
+import math
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Optional
+
+from core import progress
+
+
+def ber_confidence_interval(n_err, n_bits, confidence=0.95):
+    """Wilson score interval for a bit error rate. Returns (lo, hi)."""
+    if n_bits <= 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = n_err / n_bits
+    denom = 1 + z**2 / n_bits
+    centre = (p + z**2 / (2 * n_bits)) / denom
+    half = z * math.sqrt(p * (1 - p) / n_bits + z**2 / (4 * n_bits**2)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+@dataclass
+class StoppingRule:
+    """
+    When to stop simulating one SNR point.
+
+    Without target_errors / ci_rel_width this is the classic fixed budget:
+    exactly n_bits (rounded up to whole batches). Otherwise the point stops
+    once every given criterion holds (at least target_errors errors; CI
+    width / BER <= ci_rel_width), but never before min_bits and never after
+    max_bits (default: n_bits).
+    """
+    n_bits: int = 200000
+    target_errors: Optional[int] = None
+    ci_rel_width: Optional[float] = None
+    min_bits: Optional[int] = None
+    max_bits: Optional[int] = None
+    confidence: float = 0.95
+
+    @property
+    def adaptive(self):
+        return self.target_errors is not None or self.ci_rel_width is not None
+
+    @property
+    def budget(self):
+        """Largest number of bits a point may use."""
+        if not self.adaptive:
+            return self.n_bits
+        return self.max_bits if self.max_bits is not None else self.n_bits
+
+    def done(self, n_err, n_bits, estimate=None):
+        """
+        estimate = (ber, lo, hi) replaces the Wilson interval, e.g. for
+        importance sampling where n_err counts the raw (biased) errors.
+        """
+        if n_bits >= self.budget:
+            return True
+        if not self.adaptive:
+            return False
+        if self.min_bits is not None and n_bits < self.min_bits:
+            return False
+        if self.target_errors is not None and n_err < self.target_errors:
+            return False
+        if self.ci_rel_width is not None:
+            if n_err == 0:
+                return False
+            if estimate is None:
+                estimate = (n_err / n_bits,) + ber_confidence_interval(n_err, n_bits, self.confidence)
+            ber, lo, hi = estimate
+            if ber <= 0 or (hi - lo) / ber > self.ci_rel_width:
+                return False
+        return True
+
+
+def run_until(batch_fn, rule):
+    """
+    Calls batch_fn() -> (n_err, n_bits) until rule.done(); returns totals.
+    Raises core.progress.Cancelled between batches if the job is cancelled.
+    """
+    n_err, n_tot = 0, 0
+    while not rule.done(n_err, n_tot):
+        progress.check_cancelled()
+        e, b = batch_fn()
+        n_err += int(e)
+        n_tot += int(b)
+    return n_err, n_tot
+
+
+def point_kpis(n_err, n_bits, confidence=0.95):
+    """BER estimate plus CI for one SNR point."""
+    lo, hi = ber_confidence_interval(n_err, n_bits, confidence)
+    return {"ber": n_err / n_bits if n_bits else 0.0, "ci": [lo, hi],
+            "errors": n_err, "bits": n_bits}
+
+
+class WeightedCounts:
+    """
+    Running importance-sampling BER estimate. Each symbol adds
+    z = w * (bit errors in the symbol); BER = mean(z) / k, with a normal CI
+    from the sample variance of z.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self.n_sym = 0
+        self.raw_errors = 0
+        self.s1 = 0.0
+        self.s2 = 0.0
+
+    @classmethod
+    def resume(cls, k, raw_errors, n_bits, s1, s2):
+        """Continues from stored counts (see core.point_store)."""
+        acc = cls(k)
+        acc.n_sym, acc.raw_errors, acc.s1, acc.s2 = n_bits // k, raw_errors, s1, s2
+        return acc
+
+    def add(self, weights, sym_errors):
+        z = weights * sym_errors
+        self.n_sym += z.size
+        self.raw_errors += int(sym_errors.sum())
+        self.s1 += float(z.sum())
+        self.s2 += float((z * z).sum())
+
+    @property
+    def n_bits(self):
+        return self.n_sym * self.k
+
+    def estimate(self, confidence=0.95):
+        """(ber, lo, hi)"""
+        if self.n_sym == 0:
+            return 0.0, 0.0, 1.0
+        mean = self.s1 / self.n_sym
+        var = max(self.s2 / self.n_sym - mean * mean, 0.0) / self.n_sym
+        half = NormalDist().inv_cdf(0.5 + confidence / 2) * math.sqrt(var)
+        return mean / self.k, max(0.0, mean - half) / self.k, min(self.k, mean + half) / self.k
+
+    def kpis(self, confidence=0.95):
+        """Same keys as point_kpis(); errors are the raw (biased) error count."""
+        ber, lo, hi = self.estimate(confidence)
+        return {"ber": ber, "ci": [lo, hi], "errors": self.raw_errors, "bits": self.n_bits}
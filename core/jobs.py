@@ -0,0 +1,231 @@
+"""
+Background jobs with priorities, progress and cancellation.
+
+submit() returns a job id at once; the job runs on one of max_workers
+threads, highest priority class first (FIFO within a class):
+
+    interactive   constellation plots, answered in seconds
+    normal        radio maps
+    batch         BER / MIMO sweeps, may take minutes
+
+With reserved=N, N of the threads only ever run interactive jobs, so a
+constellation request does not wait behind long sweeps (the other
+max_workers - N threads take any job). Every job owns a
+core.progress.ProgressContext: the tool fills in the bits/errors done per
+SNR point, and cancel() sets its event (the Monte-Carlo loops stop at
+their next batch; a queued job never starts). status() / watch() let a
+CLI or UI poll or stream that state.
+"""
+import itertools
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from core.logger import setup_logger
+from core.progress import Cancelled, ProgressContext
+
+PRIORITIES = {"interactive": 0, "normal": 1, "batch": 2}
+TASK_PRIORITY = {
+    "constellation": "interactive",
+    "radiomap": "normal",
+    "multi_radio_map": "normal",
+    "ber": "batch",
+    "mimo_comparison": "batch",
+}
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+TERMINAL = (DONE, FAILED, CANCELLED)
+
+
+@dataclass
+class Job:
+    id: str
+    label: str = ""
+    priority: str = "normal"
+    status: str = QUEUED
+    progress: ProgressContext = field(default_factory=ProgressContext)
+    partial: Any = None                  # latest preview the job published
+    result: Any = None
+    error: Optional[str] = None
+    submitted: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    done_event: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def cancel_event(self):
+        return self.progress.cancel_event
+
+    def snapshot(self):
+        end = self.finished or time.time()
+        return {"id": self.id, "label": self.label, "priority": self.priority,
+                "status": self.status, "error": self.error,
+                "elapsed_s": end - (self.started or end),
+                "queued_s": (self.started or end) - self.submitted,
+                "progress": self.progress.snapshot()}
+
+
+class JobQueue:
+    """
+    jobs.submit(fn, *args, priority=...) -> job id; fn(job, *args) runs on
+    a worker thread and returns the job's result. It may set job.partial
+    and should pass job.progress on to the tool.
+    """
+
+    def __init__(self, max_workers=2, reserved=0, keep_finished=100):
+        self.max_workers = max_workers
+        self.reserved = min(reserved, max_workers - 1)   # threads kept for interactive jobs
+        self.keep_finished = keep_finished
+        self.logger = setup_logger("JobQueue")
+        self._jobs = OrderedDict()               # id -> Job (finished ones pruned)
+        self._pending = []                       # [(priority, seq, job, fn, args)]
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._running_other = 0                  # running non-interactive jobs
+        self._closed = False
+
+    # ---- submit / control ----
+    def submit(self, fn, *args, priority="normal", label=""):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority} (use {', '.join(PRIORITIES)})")
+        job = Job(id=uuid.uuid4().hex[:12], label=label, priority=priority)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("JobQueue is closed")
+            self._jobs[job.id] = job
+            self._pending.append((PRIORITIES[priority], next(self._seq), job, fn, args))
+            self._pending.sort(key=lambda p: p[:2])
+            while len(self._threads) < self.max_workers:
+                t = threading.Thread(target=self._work, name=f"job-worker-{len(self._threads)}",
+                                     daemon=True)
+                self._threads.append(t)
+                t.start()
+            self._cond.notify_all()
+        self.logger.info(f"Job {job.id} queued ({label or 'job'}, {priority})")
+        return job.id
+
+    def get(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(f"Unknown job: {job_id}")
+        return job
+
+    def status(self, job_id):
+        return self.get(job_id).snapshot()
+
+    def list(self):
+        with self._cond:
+            jobs = list(self._jobs.values())
+        return [j.snapshot() for j in jobs]
+
+    def cancel(self, job_id):
+        """Cancels a queued or running job; False if it had already finished (or is unknown)."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in TERMINAL:
+                return False
+            job.cancel_event.set()
+            if job.status == QUEUED:
+                self._pending = [p for p in self._pending if p[2] is not job]
+                self._finish(job, CANCELLED)
+        self.logger.info(f"Job {job_id} cancel requested")
+        return True
+
+    def wait(self, job_id, timeout=None):
+        job = self.get(job_id)
+        job.done_event.wait(timeout)
+        return job
+
+    def watch(self, job_id, interval_s=0.5):
+        """Yields status() now, on every change and once more when the job ends."""
+        job = self.get(job_id)
+        last = None
+        while True:
+            finished = job.done_event.wait(interval_s) if last is not None else job.done_event.is_set()
+            snap = job.snapshot()
+            view = {k: v for k, v in snap.items() if k not in ("elapsed_s", "queued_s")}
+            if view != last or finished:
+                last = view
+                yield snap
+            if finished:
+                return
+
+    def close(self):
+        """Cancels everything still queued or running; running jobs stop at their next check."""
+        with self._cond:
+            self._closed = True
+            jobs = [j for j in self._jobs.values() if j.status not in TERMINAL]
+            self._cond.notify_all()
+        for job in jobs:
+            self.cancel(job.id)
+
+    # ---- internals ----
+    def _next(self):
+        """Highest-priority pending job this thread may run (called under the lock)."""
+        for i, (prio, _, job, fn, args) in enumerate(self._pending):
+            if prio == PRIORITIES["interactive"] or \
+                    self._running_other < self.max_workers - self.reserved:
+                del self._pending[i]
+                return job, fn, args
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                picked = self._next()
+                while picked is None:
+                    if self._closed:
+                        return
+                    self._cond.wait()
+                    picked = self._next()
+                job, fn, args = picked
+                job.status, job.started = RUNNING, time.time()
+                other = job.priority != "interactive"
+                self._running_other += other
+            try:
+                result, status, error = fn(job, *args), DONE, None
+                if job.cancel_event.is_set():
+                    status = CANCELLED
+            except Cancelled:
+                result, status, error = None, CANCELLED, None
+            except Exception as e:
+                self.logger.error(f"Job {job.id} failed: {e}")
+                result, status, error = None, FAILED, str(e)
+            with self._cond:
+                self._running_other -= other
+                job.result, job.error = result, error
+                self._finish(job, status)
+                self._cond.notify_all()
+
+    def _finish(self, job, status):
+        """Marks a job finished and forgets the oldest finished ones (under the lock)."""
+        job.status, job.finished = status, time.time()
+        job.done_event.set()
+        self.logger.info(f"Job {job.id} {status}")
+        done = [j for j in self._jobs.values() if j.status in TERMINAL]
+        for old in done[:max(0, len(done) - self.keep_finished)]:
+            del self._jobs[old.id]
+
+
+def progress_text(status, max_points=8):
+    """One line per series: bits (errors) done per SNR point, for CLI / UI display."""
+    head = f"Job {status['id']} ({status['label']}, {status['priority']}): {status['status']}"
+    if status["status"] == QUEUED:
+        head += f", queued {status['queued_s']:.0f} s"
+    else:
+        head += f", {status['elapsed_s']:.1f} s"
+    if status.get("error"):
+        head += f" - {status['error']}"
+    prog = status["progress"]
+    lines = [head]
+    for name, bits, errs in zip(prog["series"], prog["bits"], prog["errors"]):
+        cells = [f"{snr:g} dB: {b:,} bits ({e} err)"
+                 for snr, b, e in zip(prog["points"], bits, errs) if b][-max_points:]
+        if cells:
+            lines.append(f"  {name or 'BER'}: " + " | ".join(cells))
+    return "\n".join(lines)
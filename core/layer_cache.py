@@ -0,0 +1,52 @@
+"""
+Process-wide LRU cache for Sionna layers and compiled graphs.
+
+Building a Mapper/Demapper/channel and, above all, tracing a tf.function
+costs far more than a small simulation. The tools look their objects up
+here instead, keyed on what defines them (e.g. ("demapper", "app", k),
+("flat_fading", nt, nr), ("ber_graph", k, fading, "app", batch_size, xla)),
+so repeat calls in a long-lived process (core.worker_pool) reuse them.
+"""
+import threading
+from collections import OrderedDict
+
+
+class LayerCache:
+    """get(key, build): cached value, or build() stored as most recent."""
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+        value = build()                 # outside the lock: may trace a graph
+        with self._lock:
+            self.misses += 1
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        return {"size": len(self._items), "maxsize": self.maxsize,
+                "hits": self.hits, "misses": self.misses}
+
+    def __len__(self):
+        return len(self._items)
+
+
+# Shared by the PHY tools
+layer_cache = LayerCache()
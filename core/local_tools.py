@@ -6,21 +6,84 @@ to the actual Sionna tool implementations inside /tools.
 
 IMPORTANT:
 - Do NOT keep dummy/stub tool functions here.
-- Only keep imports + registry.
+- Only keep the registry: tool name -> "module:function".
+
+Tool modules (and with them NumPy/matplotlib/TensorFlow) are imported on
+first lookup, so importing main stays fast; prefetch() imports them on a
+background thread while the user is still typing.
 """
+import importlib
+import os
+import sys
+import threading
+from collections.abc import Mapping
+
+
+def use_headless_plots():
+    """Agg backend when there is no display and no backend was chosen."""
+    if os.environ.get("MPLBACKEND") or "matplotlib.pyplot" in sys.modules:
+        return
+    if sys.platform.startswith("linux") and not (os.environ.get("DISPLAY")
+                                                 or os.environ.get("WAYLAND_DISPLAY")):
+        os.environ["MPLBACKEND"] = "Agg"
+
+
+class LazyToolRegistry(Mapping):
+    """Read-only {tool_name: callable} that imports each tool module on first use."""
+
+    def __init__(self, specs):
+        self._specs = dict(specs)
+        self._loaded = {}
+        self._lock = threading.Lock()
 
-from tools.simulate_constellation import simulate_constellation
-from tools.simulate_ber import simulate_ber
-from tools.simulate_ber_mimo import simulate_ber_mimo
-from tools.simulate_radio_map import simulate_radio_map
-from tools.simulate_multi_radio_map import simulate_multi_radio_map
+    def __getitem__(self, name):
+        fn = self._loaded.get(name)
+        if fn is None:
+            module, attr = self._specs[name].split(":")
+            use_headless_plots()
+            with self._lock:
+                fn = getattr(importlib.import_module(module), attr)
+                self._loaded[name] = fn
+        return fn
+
+    def __iter__(self):
+        return iter(self._specs)
+
+    def __len__(self):
+        return len(self._specs)
+
+    def is_loaded(self, name):
+        return name in self._loaded
+
+    def prefetch(self, names=None, background=True):
+        """Imports the given tools (default: all); returns the thread if background."""
+        names = list(self._specs) if names is None else list(names)
+
+        def load():
+            for name in names:
+                try:
+                    self[name]
+                except Exception:
+                    pass                # surfaces again on the real call
+        if not background:
+            load()
+            return None
+        t = threading.Thread(target=load, name="tool-prefetch", daemon=True)
+        t.start()
+        return t
 
 
 # Registry used by SimulationAgent
-LOCAL_TOOL_REGISTRY = {
-    "simulate_constellation": simulate_constellation,
-    "simulate_ber": simulate_ber,
-    "simulate_ber_mimo": simulate_ber_mimo,
-    "simulate_radio_map": simulate_radio_map,
-    "simulate_multi_radio_map": simulate_multi_radio_map,
-}
+LOCAL_TOOL_REGISTRY = LazyToolRegistry({
+    "simulate_constellation": "tools.simulate_constellation:simulate_constellation",
+    "simulate_ber": "tools.simulate_ber:simulate_ber",
+    "simulate_ber_mimo": "tools.simulate_ber_mimo:simulate_ber_mimo",
+    "simulate_radio_map": "tools.simulate_radio_map:simulate_radio_map",
+    "simulate_multi_radio_map": "tools.simulate_multi_radio_map:simulate_multi_radio_map",
+})
+
+# Generator variants (coarse-to-fine previews) used by SimulationAgent.run_stream
+LOCAL_STREAM_TOOL_REGISTRY = LazyToolRegistry({
+    "simulate_radio_map": "tools.simulate_radio_map:simulate_radio_map_progressive",
+    "simulate_multi_radio_map": "tools.simulate_multi_radio_map:simulate_multi_radio_map_progressive",
+})
@@ -1,4 +1,5 @@
-import requests
+import asyncio
+
 from core.schemas import ToolResult
 
 class MCPClient:
@@ -11,14 +12,58 @@ class MCPClient:
       /simulate_radio_map
       /simulate_multi_radio_map
     """
-    def __init__(self, base_url="http://localhost:8080"):
+    def __init__(self, base_url="http://localhost:8080", timeout=120):
         self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._aclient = None        # httpx.AsyncClient, bound to the loop that created it
+        self._aloop = None
 
     def call_tool(self, tool_name: str, params: dict) -> ToolResult:
         url = f"{self.base_url}/{tool_name}"
         try:
-            r = requests.post(url, json=params, timeout=120)
+            import requests     # only when MCP is actually used (cold start)
+            r = requests.post(url, json=params, timeout=self.timeout)
             r.raise_for_status()
             return ToolResult(ok=True, payload=r.json())
         except Exception as e:
             return ToolResult(ok=False, payload={}, error=str(e))
+
+    async def acall_tool(self, tool_name: str, params: dict) -> ToolResult:
+        """
+        Non-blocking call_tool() on a shared httpx.AsyncClient (connections
+        are reused across calls). Without httpx the blocking call runs in a
+        thread instead.
+        """
+        url = f"{self.base_url}/{tool_name}"
+        try:
+            import httpx
+        except ImportError:
+            return await asyncio.to_thread(self.call_tool, tool_name, params)
+        try:
+            loop = asyncio.get_running_loop()
+            if self._aclient is None or self._aloop is not loop:
+                self._close_stale()
+                self._aclient = httpx.AsyncClient(timeout=self.timeout)
+                self._aloop = loop
+            r = await self._aclient.post(url, json=params)
+            r.raise_for_status()
+            return ToolResult(ok=True, payload=r.json())
+        except Exception as e:
+            return ToolResult(ok=False, payload={}, error=str(e))
+
+    async def aclose(self):
+        if self._aclient is not None and self._aloop is asyncio.get_running_loop():
+            await self._aclient.aclose()
+            self._aclient = self._aloop = None
+        else:
+            self._close_stale()
+
+    def _close_stale(self):
+        """Closes the client of another loop on that loop, if it still runs."""
+        client, loop = self._aclient, self._aloop
+        self._aclient = self._aloop = None
+        if client is None:
+            return
+        if loop.is_running() and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        # else: its loop is gone, and with it the connections (nothing to await on)
@@ -0,0 +1,255 @@
+"""
+Pure-NumPy stand-ins for the Sionna pieces the BER/MIMO/constellation tools
+use from phy_imports(): QAM mapping, AWGN, complex Gaussian draws (noise and
+Rayleigh taps), hard, max-log and APP demapping (per I/Q axis, SquareQam) and
+ebnodb2no.
+
+Conventions match Sionna so both backends are statistically equivalent:
+  - QAM points and bit labels are Sionna's "qam" constellation (Gray per
+    axis, bit 0 = MSB of the symbol index, unit average energy)
+  - LLR = log(P(b=1) / P(b=0)), so b_hat = (llr > 0)
+  - noise variance `no` is per complex symbol (no/2 per real dimension)
+"""
+import math
+
+import numpy as np
+
+
+def bits_per_symbol(modulation):
+    """'qpsk' -> 2, '16qam' -> 4, ...; None for unknown modulations."""
+    mod = modulation.lower()
+    if mod == "qpsk":
+        return 2
+    if "qam" in mod:
+        return int(np.log2(int(mod.replace("qam", ""))))
+    return None
+
+
+def ebnodb2no(ebno_db, num_bits_per_symbol, coderate=1.0):
+    """Noise variance for unit-energy symbols (same as Sionna's ebnodb2no)."""
+    ebno = 10 ** (np.asarray(ebno_db, dtype=np.float64) / 10)
+    return 1.0 / (ebno * coderate * num_bits_per_symbol)
+
+
+def _pam_gray(b):
+    """Sionna's recursive Gray PAM amplitude for a tuple of bits."""
+    if len(b) > 1:
+        return (1 - 2 * b[0]) * (2 ** len(b[1:]) - _pam_gray(b[1:]))
+    return 1 - 2 * b[0]
+
+
+def qam_constellation(k):
+    """
+    Square 2^k-QAM, indexed like Sionna: point i carries the bits of i
+    (MSB first); even bits select the real part, odd bits the imaginary part.
+    Returns complex128 [2^k].
+    """
+    assert k % 2 == 0, "QAM needs an even number of bits per symbol."
+    M = 2 ** k
+    bits = ((np.arange(M)[:, None] >> np.arange(k - 1, -1, -1)) & 1)
+    pts = np.array([_pam_gray(tuple(b[0::2])) + 1j * _pam_gray(tuple(b[1::2])) for b in bits])
+
+    n = k // 2
+    qam_var = 1 / (2 ** (n - 2)) * np.sum(np.linspace(1, 2 ** n - 1, 2 ** (n - 1)) ** 2)
+    return pts / np.sqrt(qam_var)
+
+
+def bits_to_index(bits):
+    """bits [..., k] (MSB first) -> symbol index [...]"""
+    k = bits.shape[-1]
+    weights = (1 << np.arange(k - 1, -1, -1)).astype(np.int64)
+    return bits.astype(np.int64) @ weights
+
+
+def index_to_bits(idx, k):
+    """symbol index [...] -> bits [..., k] (MSB first)"""
+    return ((np.asarray(idx)[..., None] >> np.arange(k - 1, -1, -1)) & 1).astype(np.int8)
+
+
+def random_bits(rng, shape):
+    return rng.integers(0, 2, size=shape, dtype=np.int8)
+
+
+def qam_map(bits, points):
+    """bits [..., k] -> symbols [...]"""
+    return points[bits_to_index(bits)]
+
+
+def complex_normal(rng, shape, var=1.0):
+    """CN(0, var) samples."""
+    std = np.sqrt(np.asarray(var) / 2)
+    return std * (rng.standard_normal(shape) + 1j * rng.standard_normal(shape))
+
+
+def fill_complex_normal(rng, out, var=1.0):
+    """
+    In-place CN(0, var) samples into a C-contiguous complex64 array.
+    var is a scalar or broadcastable to out.
+    """
+    f = out.view(np.float32)
+    rng.standard_normal(dtype=np.float32, out=f)
+    if np.ndim(var):
+        out *= np.sqrt(np.asarray(var, dtype=np.float32) / 2)
+    else:
+        f *= np.float32(np.sqrt(var / 2))
+    return out
+
+
+def awgn(rng, x, no):
+    """y = x + n, n ~ CN(0, no); `no` broadcastable to x."""
+    return x + complex_normal(rng, x.shape, no)
+
+
+def _logsumexp(a):
+    m = a.max(axis=-1)
+    return m + np.log(np.exp(a - m[..., None]).sum(axis=-1))
+
+
+class SquareQam:
+    """
+    Lookup tables for square 2^k-QAM with Sionna's labeling.
+
+    The real and imaginary parts are independent Gray PAMs, so hard
+    decisions slice each axis separately (O(1) per symbol, no [B, M]
+    distance matrix) and index -> bits is a table lookup. Works in
+    complex64 / int8.
+    """
+
+    def __init__(self, k):
+        assert k % 2 == 0, "QAM needs an even number of bits per symbol."
+        self.k = k
+        self.m = 2 ** (k // 2)                      # levels per axis
+        pts = qam_constellation(k)
+        self.points = pts.astype(np.complex64)      # [M]
+        self.bits = index_to_bits(np.arange(2 ** k), k)   # [M, k] int8
+
+        # Points * scale are the odd integers -(m-1) .. (m-1) on each axis
+        self.scale = float(1.0 / np.min(np.abs(pts.real)))
+        col = np.rint((pts.real * self.scale + self.m - 1) / 2).astype(np.int64)
+        row = np.rint((pts.imag * self.scale + self.m - 1) / 2).astype(np.int64)
+        self.grid = np.empty((self.m, self.m), dtype=np.int64)   # [re level, im level] -> index
+        self.grid[col, row] = np.arange(2 ** k)
+
+        # Per-axis tables for the soft demappers. Axis bit j of level l is
+        # symbol bit 2j (real axis) or 2j+1 (imag axis); both axes share them.
+        n = k // 2
+        self.levels = ((2 * np.arange(self.m) - (self.m - 1)) / self.scale).astype(np.float32)
+        self.axis_bits = self.bits[self.grid[:, 0]][:, 0::2]          # [m, n]
+        assert np.array_equal(self.axis_bits, self.bits[self.grid[0, :]][:, 1::2])
+
+        # Nearest level on each side whose bit j differs from level l (+-inf if none)
+        self.left = np.full((self.m, n), -np.inf, dtype=np.float32)
+        self.right = np.full((self.m, n), np.inf, dtype=np.float32)
+        for l in range(self.m):
+            for j in range(n):
+                other = np.nonzero(self.axis_bits[:, j] != self.axis_bits[l, j])[0]
+                lo, hi = other[other < l], other[other > l]
+                if lo.size:
+                    self.left[l, j] = self.levels[lo[-1]]
+                if hi.size:
+                    self.right[l, j] = self.levels[hi[0]]
+
+    def buffers(self, shape):
+        """Work buffers for hard_bits() on arrays of `shape`, reusable across batches."""
+        return {
+            "re": np.empty(shape, dtype=np.float32),
+            "im": np.empty(shape, dtype=np.float32),
+            "lin": np.empty(shape, dtype=np.intp),
+            "idx": np.empty(shape, dtype=np.intp),
+            "bits": np.empty(tuple(shape) + (self.k,), dtype=np.int8),
+        }
+
+    def slice_axis(self, v, out):
+        """PAM level 0..m-1 nearest to each real value v, into float32 `out`."""
+        np.multiply(v, np.float32(self.scale / 2), out=out)
+        out += np.float32((self.m - 1) / 2)
+        np.rint(out, out=out)
+        np.clip(out, 0, self.m - 1, out=out)
+        return out
+
+    def hard_index(self, y, buf=None):
+        """Nearest-point symbol indices for y [...] (complex64)."""
+        buf = buf if buf is not None else self.buffers(y.shape)
+        re, im = buf["re"], buf["im"]
+        self.slice_axis(y.real, re)
+        self.slice_axis(y.imag, im)
+        re *= self.m
+        re += im                                    # re level * m + im level
+        buf["lin"][...] = re
+        return np.take(self.grid.ravel(), buf["lin"], out=buf["idx"])
+
+    def hard_bits(self, y, buf=None):
+        """Nearest-point hard decisions: y [...] -> bits [..., k] int8."""
+        buf = buf if buf is not None else self.buffers(y.shape)
+        idx = self.hard_index(y, buf)
+        return np.take(self.bits, idx, axis=0, out=buf["bits"])
+
+    def llr(self, y, no, method="maxlog"):
+        """
+        Soft bits for y [...] (no broadcastable to y) -> llr [..., k] float32.
+
+        Both demappers work per axis: max-log compares the nearest level with
+        the nearest opposite-bit level (O(1) per bit), and exact APP only sums
+        over the sqrt(M) levels of one axis, since the other axis cancels.
+        """
+        no = np.asarray(no, dtype=np.float32)
+        out = np.empty(y.shape + (self.k,), dtype=np.float32)
+        for axis, v in enumerate((y.real, y.imag)):
+            v = v.astype(np.float32, copy=False)
+            if method == "maxlog":
+                self._maxlog_axis(v, no, out[..., axis::2])
+            elif method == "app":
+                self._app_axis(v, no, out[..., axis::2])
+            else:
+                raise ValueError(f"Unknown demapping method: {method}")
+        return out
+
+    def _maxlog_axis(self, v, no, out):
+        lvl = self.slice_axis(v, np.empty(v.shape, dtype=np.float32)).astype(np.intp)
+        d_near = (v - self.levels[lvl]) ** 2
+        for j in range(self.k // 2):
+            d_other = np.minimum((v - self.left[lvl, j]) ** 2, (v - self.right[lvl, j]) ** 2)
+            sign = 1 - 2 * self.axis_bits[lvl, j].astype(np.float32)
+            # llr = (d0 - d1) / no; the nearest level carries the bit it decides
+            out[..., j] = sign * (d_near - d_other) / no
+
+    def _app_axis(self, v, no, out):
+        metric = -(v[..., None] - self.levels) ** 2 / no[..., None]     # [..., m]
+        for j in range(self.k // 2):
+            ones = self.axis_bits[:, j].astype(bool)
+            out[..., j] = _logsumexp(metric[..., ones]) - _logsumexp(metric[..., ~ones])
+
+
+def qam_ber_theory(k, ebno_db_list, fading=False):
+    """
+    Closed-form BER of square 2^k-QAM (Sionna labeling, nearest-point
+    decisions) over AWGN or flat Rayleigh fading with perfect CSI.
+
+    Exact for this Gray-per-axis mapping: per axis, the probability that
+    bit j of level l lands in a region with the other bit value is a sum of
+    Q(t / sigma) terms over region edges t. Rayleigh averages each term over
+    |h|^2 ~ Exp(1): E[Q(a sqrt(g))] = (1 - sqrt(a^2 / (2 + a^2))) / 2.
+    """
+    qam = SquareQam(k)
+    lv = qam.levels.astype(np.float64)
+    edges = np.concatenate([[-np.inf], (lv[:-1] + lv[1:]) / 2, [np.inf]])
+
+    def q_avg(t, sigma):
+        # E[Q(t / sigma_eff)], t may be +-inf or negative
+        if np.isinf(t):
+            return 0.0 if t > 0 else 1.0
+        a = abs(t) / sigma
+        q = (1 - math.sqrt(a * a / (2 + a * a))) / 2 if fading else math.erfc(a / math.sqrt(2)) / 2
+        return q if t > 0 else 1 - q
+
+    out = []
+    for ebno_db in ebno_db_list:
+        sigma = math.sqrt(float(ebnodb2no(ebno_db, k)) / 2)      # per real dimension
+        p = 0.0
+        for l in range(qam.m):
+            for j in range(k // 2):
+                for l2 in np.nonzero(qam.axis_bits[:, j] != qam.axis_bits[l, j])[0]:
+                    # P(lo < a_l + n < hi) = Q((lo - a_l)/sigma) - Q((hi - a_l)/sigma)
+                    p += q_avg(edges[l2] - lv[l], sigma) - q_avg(edges[l2 + 1] - lv[l], sigma)
+        out.append(p / (qam.m * (k // 2)))
+    return out
@@ -0,0 +1,116 @@
+"""
+Deterministic process-parallel executor for the BER / MIMO sweeps.
+
+A sweep is split into independent tasks (SNR points, configs). Every task
+gets its own child of one SeedSequence, so the numbers it draws depend only
+on (seed, task index): results are bit-for-bit identical for any worker
+count, including the inline n_workers=1 run. Workers are spawned (never
+forked from a process that may hold TensorFlow/BLAS threads) and cap their
+own BLAS/TF thread pools on start-up, and results come back in task order.
+"""
+import contextlib
+import multiprocessing as mp
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from core import progress
+
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS",
+    "TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS",
+)
+
+
+def resolve_workers(n_workers):
+    """-1 / 0 -> all cores, otherwise at least 1."""
+    if n_workers is None or n_workers <= 0:
+        return os.cpu_count() or 1
+    return int(n_workers)
+
+
+def spawn_seeds(seed, n_tasks):
+    """
+    (root SeedSequence, one child per task). root.entropy reproduces a
+    seed=None run; seed may already be a SeedSequence.
+    """
+    import numpy as np      # not at module level: workers import this before _cap_threads
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return root, root.spawn(n_tasks)
+
+
+def _cap_threads(threads):
+    """
+    Pool initializer: thread limits for this worker only (the parent's
+    environment is never touched, so concurrent pools cannot mix caps).
+    Libraries loaded later (BLAS via numpy, TensorFlow) read the env vars;
+    threadpoolctl, if installed, also caps pools the worker already loaded.
+    """
+    os.environ.update({k: str(threads) for k in THREAD_ENV_VARS})
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    threadpool_limits(threads)
+
+
+def _run_task(fn, cancel_event, task):
+    """Runs one task in a pool worker, cancellable through core.progress."""
+    ctx = progress.ProgressContext(cancel_event) if cancel_event is not None else None
+    with progress.activate(ctx):
+        return fn(*task)
+
+
+def run_tasks(fn, tasks, n_workers=1, threads_per_worker=None, on_done=None):
+    """
+    fn(*task) for every task, results in task order.
+    fn must be a module-level function (it is pickled by reference).
+    on_done(i, result) runs in the caller as task i finishes (e.g. progress
+    reporting). It may return task indices that are no longer needed:
+    those not started yet are skipped and their result is None. If it
+    raises, the pending tasks are cancelled and the exception propagates.
+    Inside a core.progress context, cancelling it also stops the running
+    tasks at their next check_cancelled().
+    """
+    n_workers = min(resolve_workers(n_workers), len(tasks))
+    if n_workers <= 1:
+        results, skip = [], set()
+        for i, t in enumerate(tasks):
+            results.append(None if i in skip else fn(*t))
+            if on_done is not None and i not in skip:
+                skip.update(on_done(i, results[-1]) or ())
+        return results
+
+    if threads_per_worker is None:
+        threads_per_worker = max(1, (os.cpu_count() or 1) // n_workers)
+
+    ctx = progress.current()
+    with contextlib.ExitStack() as stack:
+        spawn = mp.get_context("spawn")
+        # Event proxy the workers can poll (only paid for when cancellable)
+        cancel = stack.enter_context(spawn.Manager()).Event() if ctx is not None else None
+        ex = stack.enter_context(ProcessPoolExecutor(max_workers=n_workers, mp_context=spawn,
+                                                     initializer=_cap_threads,
+                                                     initargs=(threads_per_worker,)))
+        futures = [ex.submit(_run_task, fn, cancel, t) for t in tasks]
+        index = {f: i for i, f in enumerate(futures)}
+        pending = set(futures)
+        try:
+            while pending:
+                finished, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for f in finished:
+                    if f.cancelled():
+                        continue
+                    result = f.result()
+                    if on_done is not None:
+                        for j in on_done(index[f], result) or ():
+                            futures[j].cancel()         # only if not started yet
+                if ctx is not None:
+                    ctx.check()
+        except BaseException:
+            for f in pending:
+                f.cancel()
+            if cancel is not None:
+                cancel.set()
+            raise
+        return [None if f.cancelled() else f.result() for f in futures]
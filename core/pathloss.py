@@ -0,0 +1,481 @@
+"""
+Vectorized analytical path-loss kernel shared by the radio-map tools.
+
+Model (same as the original per-pixel loops):
+  d      = sqrt((x - tx_x)^2 + (y - tx_y)^2 + tx_z^2) + 1e-6
+  pl_db  = 20*log10(4*pi/lambda) + 10*n*log10(d)
+  rx_dbm = tx_power_dbm - pl_db
+
+Maps are indexed [y, x] (row = y), matching plt.imshow(origin="lower").
+
+Every kernel takes an optional `obstacles` object (see core.buildings.
+BuildingIndex) whose loss_db(xs, ys, tx_pos, frequency_hz) grid is
+subtracted from the received power.
+"""
+from itertools import product
+
+import numpy as np
+
+SPEED_OF_LIGHT = 3e8
+DIST_EPS = 1e-6
+
+_DTYPES = {"float64": np.float64, "float32": np.float32}
+
+
+def resolve_dtype(dtype="float64"):
+    """Accepts "float64"/"float32" or a numpy dtype; returns a numpy dtype."""
+    if isinstance(dtype, str):
+        if dtype not in _DTYPES:
+            raise ValueError(f"Unsupported dtype: {dtype} (use 'float64' or 'float32')")
+        return np.dtype(_DTYPES[dtype])
+    return np.dtype(dtype)
+
+
+def grid_axes(rx_grid_size, area_size):
+    """Receiver grid axes (xs, ys) centred on the origin."""
+    w, h = area_size
+    xs = np.linspace(-w/2, w/2, rx_grid_size)
+    ys = np.linspace(-h/2, h/2, rx_grid_size)
+    return xs, ys
+
+
+def fspl_constant_db(frequency_hz):
+    """20*log10(4*pi/lambda) in dB."""
+    lam = SPEED_OF_LIGHT / frequency_hz
+    return 20*np.log10(4*np.pi/lam)
+
+
+def rx_power_dbm(xs, ys, tx_pos, frequency_hz, tx_power_dbm, pathloss_exp,
+                 dtype="float64", out=None, obstacles=None):
+    """
+    Received power [len(ys), len(xs)] in dBm for one TX.
+
+    Uses outer differences instead of a meshgrid so only the output grid
+    (plus one temporary of the same size) is allocated. In float64 mode the
+    operation order matches the original scalar loop, so values are identical.
+    `out` may be a preallocated array of the right shape/dtype.
+    """
+    dt = resolve_dtype(dtype)
+    tx_x, tx_y, tx_z = tx_pos
+
+    xs = np.asarray(xs, dtype=dt)
+    ys = np.asarray(ys, dtype=dt)
+    dx2 = (xs - dt.type(tx_x))**2
+    dy2 = (ys - dt.type(tx_y))**2
+    z2 = dt.type(tx_z)**2
+
+    if out is None:
+        out = np.empty((ys.shape[0], xs.shape[0]), dtype=dt)
+
+    # d = sqrt(dx^2 + dy^2 + z^2) + eps   (computed in place)
+    np.add(dx2[None, :], dy2[:, None], out=out)
+    out += z2
+    np.sqrt(out, out=out)
+    out += dt.type(DIST_EPS)
+
+    # rx = P - (fspl + 10*n*log10(d))
+    np.log10(out, out=out)
+    out *= dt.type(10*pathloss_exp)
+    out += dt.type(fspl_constant_db(frequency_hz))
+    np.subtract(dt.type(tx_power_dbm), out, out=out)
+
+    if obstacles is not None:
+        out -= obstacles.loss_db(xs, ys, tx_pos, frequency_hz, dtype=dt)
+    return out
+
+
+def iter_tiles(ny, nx, tile_size):
+    """Yields (row_slice, col_slice) covering an [ny, nx] grid."""
+    for r0 in range(0, ny, tile_size):
+        for c0 in range(0, nx, tile_size):
+            yield slice(r0, min(r0 + tile_size, ny)), slice(c0, min(c0 + tile_size, nx))
+
+
+def _axis_gap(lo, hi, t):
+    """Distance from coordinate t to the interval [lo, hi] (0 if inside)."""
+    if t < lo:
+        return lo - t
+    if t > hi:
+        return t - hi
+    return 0.0
+
+
+def combine_tx_maps(xs, ys, tx_positions, frequency_hz, tx_power_dbm, pathloss_exp,
+                    combine_mode="max", sum_method="linear", cutoff_m=None,
+                    tile_size=256, dtype="float64", obstacles=None):
+    """
+    Streaming multi-TX combiner: folds one TX at a time into a running
+    accumulator, so peak memory is O(grid) regardless of len(tx_positions).
+
+    combine_mode:
+      "max" -> running maximum in dBm
+      "sum" -> power sum; sum_method="linear" accumulates mW (same result as
+               summing a stacked array), "logsumexp" accumulates in the log
+               domain (no under/overflow, useful with float32)
+
+    cutoff_m: optional horizontal range limit. A TX is skipped for every tile
+    whose nearest point is farther than cutoff_m (tile granularity); cells no
+    TX reaches are NaN. In "max" mode tiles where a TX's best-case power
+    cannot beat the current minimum are also skipped (exact, no cutoff needed).
+    """
+    if combine_mode not in ("max", "sum"):
+        raise ValueError(f"Unknown combine_mode: {combine_mode}")
+    if sum_method not in ("linear", "logsumexp"):
+        raise ValueError(f"Unknown sum_method: {sum_method}")
+
+    dt = resolve_dtype(dtype)
+    xs = np.asarray(xs, dtype=dt)
+    ys = np.asarray(ys, dtype=dt)
+    ny, nx = ys.shape[0], xs.shape[0]
+
+    linear = combine_mode == "sum" and sum_method == "linear"
+    acc = np.zeros((ny, nx), dtype=dt) if linear else np.full((ny, nx), -np.inf, dtype=dt)
+    scratch = np.empty((min(tile_size, ny), min(tile_size, nx)), dtype=dt)
+    ln_per_db = np.log(10) / 10
+
+    for rs, cs in iter_tiles(ny, nx, tile_size):
+        xs_t, ys_t = xs[cs], ys[rs]
+        acc_t = acc[rs, cs]
+        buf = scratch[:ys_t.shape[0], :xs_t.shape[0]]
+
+        for tx in tx_positions:
+            gx = _axis_gap(xs_t[0], xs_t[-1], tx[0])
+            gy = _axis_gap(ys_t[0], ys_t[-1], tx[1])
+            if cutoff_m is not None and np.hypot(gx, gy) > cutoff_m:
+                continue
+            if combine_mode == "max":
+                d_min = np.sqrt(gx**2 + gy**2 + tx[2]**2) + DIST_EPS
+                p_best = tx_power_dbm - (fspl_constant_db(frequency_hz)
+                                         + 10*pathloss_exp*np.log10(d_min))
+                if p_best < acc_t.min():
+                    continue
+
+            rx_power_dbm(xs_t, ys_t, tx, frequency_hz, tx_power_dbm, pathloss_exp,
+                         dtype=dt, out=buf, obstacles=obstacles)
+
+            if combine_mode == "max":
+                np.maximum(acc_t, buf, out=acc_t)
+            elif linear:
+                buf /= 10
+                np.power(dt.type(10), buf, out=buf)
+                acc_t += buf
+            else:
+                buf *= dt.type(ln_per_db)
+                np.logaddexp(acc_t, buf, out=acc_t)
+
+    if combine_mode == "sum":
+        with np.errstate(divide="ignore"):
+            if linear:
+                np.log10(acc, out=acc)
+                acc *= 10
+            else:
+                acc /= dt.type(ln_per_db)
+
+    if cutoff_m is not None:
+        acc[~np.isfinite(acc)] = np.nan
+    return acc
+
+
+def compute_tiled_map(path, xs, ys, tile_fn, tile_size=1024, lod_size=1024, dtype="float64"):
+    """
+    Computes a large [len(ys), len(xs)] map tile by tile straight into a .npy
+    file on disk (open it later with np.load(path, mmap_mode="r")).
+
+    tile_fn(xs_t, ys_t, out) must fill `out` ([len(ys_t), len(xs_t)]) in place.
+    Tiles are assembled one full-width row band at a time and written
+    sequentially (no copy). The band holds about tile_size**2 values, so it
+    is shorter on wider grids, but never less than one row. Peak memory is
+    one band plus the LOD view, not the full grid.
+
+    Returns a strided level-of-detail view (about lod_size per side, kept in
+    RAM) plus the xs/ys axes of that view, for plotting.
+    """
+    dt = resolve_dtype(dtype)
+    xs = np.asarray(xs, dtype=dt)
+    ys = np.asarray(ys, dtype=dt)
+    ny, nx = ys.shape[0], xs.shape[0]
+
+    step = max(1, int(np.ceil(max(ny, nx) / lod_size)))
+    lod = np.empty((len(range(0, ny, step)), len(range(0, nx, step))), dtype=dt)
+
+    # Write the .npy header, then stream the data after it
+    header = np.lib.format.open_memmap(path, mode="w+", dtype=dt, shape=(ny, nx))
+    offset = header.offset
+    del header
+
+    band_rows = min(ny, max(1, tile_size * tile_size // nx))
+    band = np.empty((band_rows, nx), dtype=dt)
+    with open(path, "r+b") as f:
+        for r0 in range(0, ny, band_rows):
+            r1 = min(r0 + band_rows, ny)
+            rows = band[:r1 - r0]
+            for c0 in range(0, nx, tile_size):
+                cs = slice(c0, min(c0 + tile_size, nx))
+                tile_fn(xs[cs], ys[r0:r1], rows[:, cs])
+
+            first = -(-r0 // step) * step          # first LOD row inside this band
+            if first < r1:
+                lod[first // step:(r1 - 1) // step + 1] = rows[first - r0::step, ::step]
+
+            f.seek(offset + r0 * nx * dt.itemsize)
+            rows.tofile(f)
+
+    return lod, xs[::step], ys[::step]
+
+
+def sinr_maps(xs, ys, tx_positions, frequency_hz, tx_power_dbm, pathloss_exp,
+              noise_power_dbm=-94.0, dtype="float64", obstacles=None):
+    """
+    Best-server and SINR maps from a single pass over the transmitters.
+
+    Keeps three running grids (serving power, total power, serving index)
+    plus one scratch grid, and finishes everything in place:
+      serving_idx      [ny, nx] int32  index into tx_positions
+      serving_dbm      [ny, nx]        strongest received power
+      interference_dbm [ny, nx]        sum of all other TX (-inf if none)
+      sinr_db          [ny, nx]        serving / (interference + noise)
+    """
+    dt = resolve_dtype(dtype)
+    xs = np.asarray(xs, dtype=dt)
+    ys = np.asarray(ys, dtype=dt)
+    shape = (ys.shape[0], xs.shape[0])
+
+    best = np.zeros(shape, dtype=dt)          # linear mW
+    total = np.zeros(shape, dtype=dt)         # linear mW
+    idx = np.zeros(shape, dtype=np.int32)
+    buf = np.empty(shape, dtype=dt)
+    mask = np.empty(shape, dtype=bool)
+
+    for t, tx in enumerate(tx_positions):
+        rx_power_dbm(xs, ys, tx, frequency_hz, tx_power_dbm, pathloss_exp,
+                     dtype=dt, out=buf, obstacles=obstacles)
+        buf /= 10
+        np.power(dt.type(10), buf, out=buf)
+        total += buf
+        np.greater(buf, best, out=mask)
+        np.copyto(idx, t, where=mask)
+        np.maximum(best, buf, out=best)
+    del mask
+
+    # total -> interference, buf -> SINR (all in place)
+    total -= best
+    np.maximum(total, 0, out=total)
+    np.add(total, dt.type(10 ** (noise_power_dbm / 10)), out=buf)
+    np.divide(best, buf, out=buf)
+
+    with np.errstate(divide="ignore"):
+        for arr in (best, total, buf):
+            np.log10(arr, out=arr)
+            arr *= 10
+
+    return {
+        "serving_idx": idx,
+        "serving_dbm": best,
+        "interference_dbm": total,
+        "sinr_db": buf,
+    }
+
+
+def is_sweep(*values):
+    """True if any argument is a list/tuple/array of sweep values."""
+    return any(isinstance(v, (list, tuple, np.ndarray)) for v in values)
+
+
+def as_sweep(value):
+    """Scalar -> [scalar]; sequence -> list."""
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [float(v) for v in value]
+    return [float(value)]
+
+
+def sweep_points(heights, frequencies, exps, powers):
+    """Sweep points in the stacking order used by sweep_rx_power_dbm."""
+    return [
+        {"tx_height": h, "frequency_hz": f, "pathloss_exp": n, "tx_power_dbm": p}
+        for h, f, n, p in product(heights, frequencies, exps, powers)
+    ]
+
+
+def sweep_rx_power_dbm(xs, ys, tx_xy, heights, frequencies, exps, powers,
+                       dtype="float64", out=None, obstacles=None):
+    """
+    Received power for a whole parameter sweep of one TX.
+
+    Returns [H*F*N*P, ny, nx], ordered like sweep_points(). The horizontal
+    distance grid is computed once and the log-distance once per height;
+    every (frequency, exponent, power) combination is then a broadcast
+    multiply-add over that log-distance grid. Each slice is bit-identical
+    to rx_power_dbm() with the same parameters.
+    """
+    dt = resolve_dtype(dtype)
+    xs = np.asarray(xs, dtype=dt)
+    ys = np.asarray(ys, dtype=dt)
+    ny, nx = ys.shape[0], xs.shape[0]
+    H, F, N, P = len(heights), len(frequencies), len(exps), len(powers)
+
+    if out is None:
+        out = np.empty((H*F*N*P, ny, nx), dtype=dt)
+    view = out.reshape(H, F, N, P, ny, nx)
+
+    ten_n = np.asarray([10*n for n in exps], dtype=dt)[None, :, None, None, None]
+    fspl = np.asarray([fspl_constant_db(f) for f in frequencies],
+                      dtype=dt)[:, None, None, None, None]
+    ptx = np.asarray(powers, dtype=dt)[None, None, :, None, None]
+
+    dxy2 = (xs - dt.type(tx_xy[0]))**2
+    dxy2 = dxy2[None, :] + ((ys - dt.type(tx_xy[1]))**2)[:, None]
+    logd = np.empty((ny, nx), dtype=dt)
+
+    for hi, h in enumerate(heights):
+        np.add(dxy2, dt.type(h)**2, out=logd)
+        np.sqrt(logd, out=logd)
+        logd += dt.type(DIST_EPS)
+        np.log10(logd, out=logd)
+
+        block = view[hi]                                   # [F, N, P, ny, nx]
+        np.multiply(ten_n, logd, out=block)
+        block += fspl
+        np.subtract(ptx, block, out=block)
+
+        if obstacles is not None:
+            # Obstacle loss depends on TX height and wavelength only
+            for fi, f in enumerate(frequencies):
+                block[fi] -= obstacles.loss_db(xs, ys, (tx_xy[0], tx_xy[1], h), f, dtype=dt)
+    return out
+
+
+def combine_tx_sweep(xs, ys, tx_positions, heights, frequencies, exps, powers,
+                     combine_mode="max", dtype="float64", obstacles=None):
+    """
+    Multi-TX version of sweep_rx_power_dbm: folds each TX's sweep stack into a
+    running [S, ny, nx] max or linear-sum accumulator. heights=None keeps
+    each TX's own z.
+    """
+    if combine_mode not in ("max", "sum"):
+        raise ValueError(f"Sweeps support combine_mode 'max' or 'sum', got: {combine_mode}")
+
+    dt = resolve_dtype(dtype)
+    n_points = (len(heights) if heights else 1) * len(frequencies) * len(exps) * len(powers)
+    shape = (n_points, len(ys), len(xs))
+
+    acc = np.zeros(shape, dtype=dt) if combine_mode == "sum" else np.full(shape, -np.inf, dtype=dt)
+    buf = np.empty(shape, dtype=dt)
+
+    for tx in tx_positions:
+        hs = heights if heights else [tx[2]]
+        sweep_rx_power_dbm(xs, ys, tx, hs, frequencies, exps, powers, dtype=dt, out=buf,
+                           obstacles=obstacles)
+        if combine_mode == "max":
+            np.maximum(acc, buf, out=acc)
+        else:
+            buf /= 10
+            np.power(dt.type(10), buf, out=buf)
+            acc += buf
+
+    if combine_mode == "sum":
+        with np.errstate(divide="ignore"):
+            np.log10(acc, out=acc)
+            acc *= 10
+    return acc
+
+
+def _block_bounds(n, B):
+    starts = np.arange(0, n, B)
+    return starts, np.minimum(starts + B, n)
+
+
+def _needs_refinement(cur, B, grad_db, threshold_dbm):
+    """
+    Flags blocks (B x B) whose 3x3 block neighbourhood spans more than grad_db
+    or straddles threshold_dbm.
+    """
+    r_starts = np.arange(0, cur.shape[0], B)
+    c_starts = np.arange(0, cur.shape[1], B)
+    bmax = np.maximum.reduceat(np.maximum.reduceat(cur, r_starts, axis=0), c_starts, axis=1)
+    bmin = np.minimum.reduceat(np.minimum.reduceat(cur, r_starts, axis=0), c_starts, axis=1)
+
+    def spread(a, fn):
+        p = np.pad(a, 1, mode="edge")
+        out = a.copy()
+        for di in (0, 1, 2):
+            for dj in (0, 1, 2):
+                fn(out, p[di:di + a.shape[0], dj:dj + a.shape[1]], out=out)
+        return out
+
+    nmax, nmin = spread(bmax, np.maximum), spread(bmin, np.minimum)
+    flags = (nmax - nmin) > grad_db
+    if threshold_dbm is not None:
+        flags |= (nmin < threshold_dbm) & (nmax >= threshold_dbm)
+    return flags
+
+
+# progressive_map: above this fraction of flagged blocks, a level is one dense call
+DENSE_FALLBACK = 0.5
+
+
+def progressive_map(xs, ys, block_fn, strides=(16, 4, 1), grad_db=3.0,
+                    threshold_dbm=None, complete=True, dtype="float64"):
+    """
+    Coarse-to-fine map generator for interactive rendering.
+
+    block_fn(xs_sub, ys_sub) -> [len(ys_sub), len(xs_sub)] evaluates the map on
+    any sub-grid. The first yield samples every strides[0]-th point (nearest
+    upsampled to full size). Each later level re-evaluates, at its finer
+    stride, only the strides[0]-sized blocks whose neighbourhood varies by
+    more than grad_db or crosses threshold_dbm. With complete=True a last
+    pass fills the remaining blocks at full resolution, so the final yield
+    equals the dense map. Flagged blocks are evaluated one call per run of
+    adjacent blocks, or in one strided call over the grid once at least
+    DENSE_FALLBACK of them are flagged.
+
+    Yields (map [ny, nx], info dict). The map buffer is reused between yields.
+    """
+    dt = resolve_dtype(dtype)
+    xs = np.asarray(xs, dtype=dt)
+    ys = np.asarray(ys, dtype=dt)
+    ny, nx = ys.shape[0], xs.shape[0]
+    B = strides[0]
+    r0s, r1s = _block_bounds(ny, B)
+    c0s, c1s = _block_bounds(nx, B)
+    n_blocks = len(r0s) * len(c0s)
+
+    def refine(mask, s):
+        """Re-evaluates the blocks in mask at stride s (B is a multiple of s)."""
+        if mask.mean() >= DENSE_FALLBACK:
+            # One strided call over the grid beats many block calls
+            vals = block_fn(xs[::s], ys[::s])
+            cur[:] = np.repeat(np.repeat(vals, s, axis=0), s, axis=1)[:ny, :nx]
+            np.minimum(block_stride, s, out=block_stride)
+            return
+        # One call per run of adjacent flagged blocks in a block row
+        for bi in np.nonzero(mask.any(axis=1))[0]:
+            r0, r1 = r0s[bi], r1s[bi]
+            cols = np.nonzero(mask[bi])[0]
+            for run in np.split(cols, np.nonzero(np.diff(cols) > 1)[0] + 1):
+                c0, c1 = c0s[run[0]], c1s[run[-1]]
+                vals = block_fn(xs[c0:c1:s], ys[r0:r1:s])
+                up = np.repeat(np.repeat(vals, s, axis=0), s, axis=1)
+                cur[r0:r1, c0:c1] = up[:r1 - r0, :c1 - c0]
+        block_stride[mask] = s
+
+    cur = np.empty((ny, nx), dtype=dt)
+    coarse = block_fn(xs[::B], ys[::B])
+    for bi in range(len(r0s)):
+        cur[r0s[bi]:r1s[bi]] = np.repeat(coarse[bi:bi + 1], B, axis=1)[:, :nx]
+    block_stride = np.full((len(r0s), len(c0s)), B)
+    yield cur, {"stride": B, "refined_blocks": n_blocks, "total_blocks": n_blocks, "final": B == 1}
+
+    for s in strides[1:]:
+        flags = _needs_refinement(cur, B, grad_db, threshold_dbm) & (block_stride > s)
+        refine(flags, s)
+        final = s == 1 and (not complete or not (block_stride > 1).any())
+        yield cur, {"stride": s, "refined_blocks": int(flags.sum()),
+                    "total_blocks": n_blocks, "final": final}
+        if final:
+            return
+
+    if complete:
+        pending = block_stride > 1
+        refine(pending, 1)
+        yield cur, {"stride": 1, "refined_blocks": int(pending.sum()),
+                    "total_blocks": n_blocks, "final": True}
@@ -0,0 +1,9 @@
+"""
+pyplot keeps one global "current figure", so tools that run concurrently
+in threads (job queue, single-flight, async executor) would draw into each
+other's figures. Every figure block in tools/ holds plot_lock; plotting is
+short next to the simulation, so serializing it costs little.
+"""
+import threading
+
+plot_lock = threading.RLock()
@@ -0,0 +1,138 @@
+"""
+Persistent per-SNR-point Monte-Carlo accumulators (SQLite).
+
+A follow-up request ("now extend to 20 dB", "use 1 dB steps", "more
+bits") usually shares most of its points with an earlier sweep. The BER
+tools keep, per scenario (everything that defines the statistics of a
+point: modulation, channel, detector/demapper, config, seed, code
+version) and per SNR point, the errors and bits simulated so far, plus
+the importance-sampling sums s1/s2. A new request then only simulates
+missing points, and points whose stopping rule needs more bits resume
+from the stored counts.
+
+Counts are added as deltas (n_err = n_err + ?), so concurrent runs on the
+same scenario never lose samples. Every run of a scenario gets its own
+index (next_run) and draws from SeedSequence(seed, spawn_key=(scenario,
+run)), so resumed samples are fresh but still reproducible for a given
+request history.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from core.result_cache import code_version, normalize
+
+DEFAULT_PATH = os.path.join("outputs", "cache", "points.sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenarios (
+    scenario TEXT PRIMARY KEY, tool TEXT, params TEXT, runs INTEGER DEFAULT 0);
+CREATE TABLE IF NOT EXISTS points (
+    scenario TEXT, snr_db REAL, n_err INTEGER, n_bits INTEGER,
+    s1 REAL DEFAULT 0, s2 REAL DEFAULT 0, updated REAL,
+    PRIMARY KEY (scenario, snr_db));
+"""
+
+
+@dataclass
+class PointCounts:
+    """Accumulated counts of one SNR point (s1/s2: importance-sampling sums)."""
+    n_err: int = 0
+    n_bits: int = 0
+    s1: float = 0.0
+    s2: float = 0.0
+
+    def minus(self, other):
+        return PointCounts(self.n_err - other.n_err, self.n_bits - other.n_bits,
+                           self.s1 - other.s1, self.s2 - other.s2)
+
+
+def _snr_key(snr_db):
+    return round(float(snr_db), 6)
+
+
+class PointStore:
+    """
+    store.scenario(tool, **params) -> id; load(id, snr_db_list) -> {snr: PointCounts};
+    add(id, {snr: delta}); seed_sequence(seed, ids) for the next run.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """One transaction: committed on success, connection always closed."""
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def scenario(self, tool, **params):
+        """Scenario id for these statistics-defining params (registered on first use)."""
+        desc = json.dumps({"tool": tool, "params": normalize(params), "code": code_version()},
+                          sort_keys=True, separators=(",", ":"))
+        sid = hashlib.sha256(desc.encode()).hexdigest()[:32]
+        with self._connect() as db:
+            db.execute("INSERT OR IGNORE INTO scenarios (scenario, tool, params) VALUES (?, ?, ?)",
+                       (sid, tool, desc))
+        return sid
+
+    def load(self, scenario, snr_db_list):
+        """Stored counts per SNR point (zeros where nothing is stored)."""
+        with self._connect() as db:
+            rows = db.execute("SELECT snr_db, n_err, n_bits, s1, s2 FROM points WHERE scenario = ?",
+                              (scenario,)).fetchall()
+        stored = {snr: PointCounts(e, b, s1, s2) for snr, e, b, s1, s2 in rows}
+        return {snr: stored.get(_snr_key(snr), PointCounts()) for snr in snr_db_list}
+
+    def add(self, scenario, deltas):
+        """Adds {snr_db: PointCounts delta}; points without new bits are skipped."""
+        now = time.time()
+        with self._connect() as db:
+            for snr, d in deltas.items():
+                if d.n_bits <= 0:
+                    continue
+                db.execute(
+                    "INSERT INTO points (scenario, snr_db, n_err, n_bits, s1, s2, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (scenario, snr_db) DO UPDATE SET "
+                    "n_err = n_err + excluded.n_err, n_bits = n_bits + excluded.n_bits, "
+                    "s1 = s1 + excluded.s1, s2 = s2 + excluded.s2, updated = excluded.updated",
+                    (scenario, _snr_key(snr), int(d.n_err), int(d.n_bits),
+                     float(d.s1), float(d.s2), now))
+
+    def next_run(self, scenarios):
+        """Claims the next run index for a set of scenarios simulated together."""
+        with self._connect() as db:
+            db.executemany("UPDATE scenarios SET runs = runs + 1 WHERE scenario = ?",
+                           [(s,) for s in scenarios])
+            marks = ",".join("?" * len(scenarios))
+            (run,) = db.execute(f"SELECT MAX(runs) FROM scenarios WHERE scenario IN ({marks})",
+                                list(scenarios)).fetchone()
+        return int(run)
+
+    def seed_sequence(self, seed, scenarios):
+        """SeedSequence for a new run: fresh draws, reproducible from (seed, history)."""
+        tag = int(hashlib.sha256("|".join(sorted(scenarios)).encode()).hexdigest()[:8], 16)
+        return np.random.SeedSequence(seed, spawn_key=(tag, self.next_run(scenarios)))
+
+
+def open_store(point_store):
+    """point_store param of the tools: None/False, True (default path), a path or a PointStore."""
+    if not point_store:
+        return None
+    if isinstance(point_store, PointStore):
+        return point_store
+    return PointStore(DEFAULT_PATH if point_store is True else point_store)
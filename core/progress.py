@@ -0,0 +1,123 @@
+"""
+Progress reporting and cooperative cancellation for long tool runs.
+
+A job activates a ProgressContext around a tool call; the Monte-Carlo
+loops then publish their counts and poll for cancellation through the
+module-level helpers, which are no-ops when no context is active:
+
+    progress.begin(snr_db_list, series=labels)    # once per sweep
+    progress.report(series, point, bits, errors)  # per batch
+    progress.check_cancelled()                    # per batch, raises Cancelled
+
+Contexts are per thread (contextvars). core.worker_pool forwards snapshots
+and cancellation between processes, and a coalesced caller can follow()
+the context of the computation it joined.
+"""
+import contextlib
+import contextvars
+import threading
+import time
+
+
+class Cancelled(Exception):
+    """Raised inside a tool when its job was cancelled."""
+
+
+class ProgressContext:
+    """
+    Bits/errors done per (series, SNR point) of one tool run, plus the
+    event that cancels it. on_update(snapshot) is called at most every
+    min_interval_s (and on begin()).
+    """
+
+    def __init__(self, cancel_event=None, on_update=None, min_interval_s=0.0):
+        self.cancel_event = cancel_event if cancel_event is not None else threading.Event()
+        self.on_update = on_update
+        self.min_interval_s = min_interval_s
+        self.source = None                      # followed context (coalesced calls)
+        self._lock = threading.Lock()
+        self._state = {"points": [], "series": [], "bits": [], "errors": []}
+        self._last_update = 0.0
+
+    # ---- written by the tools ----
+    def begin(self, points, series=None):
+        series = list(series) if series is not None else [""]
+        with self._lock:
+            self._state = {"points": list(points), "series": [str(s) for s in series],
+                           "bits": [[0] * len(points) for _ in series],
+                           "errors": [[0] * len(points) for _ in series]}
+        self._notify(force=True)
+
+    def report(self, series, point, bits, errors):
+        with self._lock:
+            st = self._state
+            if series < len(st["bits"]) and point < len(st["points"]):
+                st["bits"][series][point] = int(bits)
+                st["errors"][series][point] = int(errors)
+        self._notify()
+
+    def check(self):
+        if self.cancel_event.is_set():
+            raise Cancelled("cancelled")
+
+    # ---- read by jobs / UIs ----
+    def follow(self, other):
+        """Mirror another context (e.g. the single-flight computation we joined)."""
+        self.source = other
+
+    def load(self, snapshot):
+        """Replace the state with a snapshot (forwarded from a worker process)."""
+        with self._lock:
+            self._state = snapshot
+
+    def snapshot(self):
+        if self.source is not None:
+            return self.source.snapshot()
+        with self._lock:
+            st = self._state
+            return {"points": list(st["points"]), "series": list(st["series"]),
+                    "bits": [list(b) for b in st["bits"]],
+                    "errors": [list(e) for e in st["errors"]]}
+
+    def _notify(self, force=False):
+        if self.on_update is None:
+            return
+        now = time.monotonic()
+        if force or now - self._last_update >= self.min_interval_s:
+            self._last_update = now
+            self.on_update(self.snapshot())
+
+
+_current = contextvars.ContextVar("progress_context", default=None)
+
+
+@contextlib.contextmanager
+def activate(ctx):
+    """Makes ctx the current context of this thread for the block (None: no-op)."""
+    token = _current.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def begin(points, series=None):
+    ctx = _current.get()
+    if ctx is not None:
+        ctx.begin(points, series)
+
+
+def report(series, point, bits, errors):
+    ctx = _current.get()
+    if ctx is not None:
+        ctx.report(series, point, bits, errors)
+
+
+def check_cancelled():
+    ctx = _current.get()
+    if ctx is not None:
+        ctx.check()
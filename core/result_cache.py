@@ -0,0 +1,295 @@
+"""
+Content-addressed cache of tool results and their artifacts.
+
+A result is keyed on sha256(tool_name, normalized params, code version):
+params are canonicalized (sorted keys, tuples -> lists, 15.0 == 15, NumPy
+scalars/arrays -> Python), out_dir is dropped (it is where the artifacts
+go, not an input) and the seed is part of the params. code_version()
+hashes the sources of tools/ and core/, so editing a model invalidates
+every entry.
+
+Layout under root:
+    <key[:2]>/<key>/result.pkl          payload, artifact paths relative
+    <key[:2]>/<key>/<sha256><ext>       plots / arrays, named by content
+    staging/<tmp>/                      out_dir of a running tool call
+
+A memory LRU sits in front of the disk store; put() enforces max_bytes
+and max_age_s on the disk store (oldest-used entries go first).
+"""
+import copy
+import functools
+import hashlib
+import json
+import numbers
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# Params that name outputs rather than inputs
+NON_KEY_PARAMS = ("out_dir",)
+ARTIFACT_PREFIX = "artifact:"
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@functools.lru_cache(maxsize=1)
+def code_version():
+    """sha256 over the tool and model sources (tools/*.py, core/*.py)."""
+    h = hashlib.sha256()
+    for sub in ("tools", "core"):
+        folder = os.path.join(_ROOT, sub)
+        for name in sorted(os.listdir(folder)):
+            if name.endswith(".py"):
+                h.update(name.encode())
+                with open(os.path.join(folder, name), "rb") as f:
+                    h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+def normalize(value):
+    """JSON-able canonical form of a parameter value."""
+    if isinstance(value, dict):
+        return {str(k): normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    if hasattr(value, "tolist"):                    # NumPy scalars and arrays
+        return normalize(value.tolist())
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real):
+        value = float(value)
+        return int(value) if value.is_integer() else value
+    return repr(value)
+
+
+def cache_key(tool_name, params, version=None):
+    params = {k: v for k, v in (params or {}).items() if k not in NON_KEY_PARAMS}
+    blob = json.dumps({"tool": tool_name, "params": normalize(params),
+                       "code": version or code_version()},
+                      sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _inside(path, folder):
+    """True if path is an existing file under folder."""
+    if folder is None or not os.path.isfile(path):
+        return False
+    folder = os.path.abspath(folder)
+    return os.path.commonpath([os.path.abspath(path), folder]) == folder
+
+
+def _map_strings(value, fn):
+    """Copy of a payload with fn applied to every string."""
+    if isinstance(value, str):
+        return fn(value)
+    if isinstance(value, dict):
+        return {k: _map_strings(v, fn) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_map_strings(v, fn) for v in value]
+    if isinstance(value, tuple):
+        return tuple(_map_strings(v, fn) for v in value)
+    return value
+
+
+class ResultCache:
+    """
+    get(key) -> payload or None; put(key, payload, staging_dir) -> payload
+    with its artifacts moved into the cache. Run tools with
+    out_dir=staging_dir() so concurrent calls never share file names.
+    """
+
+    def __init__(self, root="outputs/cache", max_memory_entries=64,
+                 max_bytes=512 * 2**20, max_age_s=7 * 24 * 3600):
+        self.root = root
+        self.max_memory_entries = max_memory_entries
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()            # key -> (payload, artifact paths)
+        self._lock = threading.Lock()
+
+    def key(self, tool_name, params):
+        return cache_key(tool_name, params)
+
+    def staging_dir(self):
+        """Fresh private out_dir for one tool call."""
+        os.makedirs(os.path.join(self.root, "staging"), exist_ok=True)
+        return tempfile.mkdtemp(dir=os.path.join(self.root, "staging"))
+
+    # ---- lookup ----
+    def get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and all(os.path.exists(p) for p in entry[1]) \
+                    and not self._expired(key):
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self._touch(key)
+                return copy.deepcopy(entry[0])
+            self._memory.pop(key, None)
+
+        entry = self._load(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, entry)
+        self._touch(key)
+        return copy.deepcopy(entry[0])
+
+    # ---- store ----
+    def put(self, key, payload, staging_dir=None):
+        """
+        Caches payload unless it carries an "error". Files under staging_dir
+        that the payload references are moved (os.replace) to
+        content-addressed paths; staging_dir is removed afterwards. Returns
+        the payload as cached. A payload whose artifacts alone exceed
+        max_bytes is not cached and comes back with its staging files kept.
+        """
+        keep_staging = False
+        try:
+            if "error" in payload:
+                return payload
+            artifacts = set()
+            _map_strings(payload, lambda s: artifacts.add(s) if _inside(s, staging_dir) else None)
+            if sum(os.path.getsize(a) for a in artifacts) > self.max_bytes:
+                keep_staging = True
+                return payload
+
+            final = self._entry_dir(key)
+            os.makedirs(self.root, exist_ok=True)
+            tmp = tempfile.mkdtemp(dir=self.root, prefix=".put-")
+            names = {}
+
+            def stash(s):
+                if s not in artifacts:
+                    return s
+                if s not in names:
+                    names[s] = _file_sha256(s) + os.path.splitext(s)[1]
+                    os.replace(s, os.path.join(tmp, names[s]))
+                return ARTIFACT_PREFIX + names[s]
+
+            stored = _map_strings(payload, stash)
+            with open(os.path.join(tmp, "result.pkl"), "wb") as f:
+                pickle.dump(stored, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            try:
+                os.rename(tmp, final)
+            except OSError:                     # same key stored concurrently: keep theirs
+                shutil.rmtree(tmp, ignore_errors=True)
+        finally:
+            if staging_dir is not None and not keep_staging:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+
+        entry = self._load(key)
+        if entry is None:
+            return payload
+        with self._lock:
+            self._remember(key, entry)
+        self.evict(keep=key)
+        return copy.deepcopy(entry[0])
+
+    def evict(self, keep=None):
+        """
+        Drops expired entries, then the least recently used until under
+        max_bytes; `keep` (the key just stored) is never dropped.
+        """
+        entries = []
+        now = time.time()
+        for shard in self._shards():
+            for key in os.listdir(shard):
+                path = os.path.join(shard, key)
+                try:
+                    used = os.path.getmtime(os.path.join(path, "result.pkl"))
+                    size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+                except OSError:
+                    continue
+                entries.append((used, size, key, path))
+        entries.sort()
+        total = sum(e[1] for e in entries)
+        for used, size, key, path in entries:
+            if now - used <= self.max_age_s and total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            with self._lock:
+                self._memory.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        for shard in self._shards():
+            shutil.rmtree(shard, ignore_errors=True)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "memory_entries": len(self._memory)}
+
+    # ---- internals ----
+    def _entry_dir(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def _shards(self):
+        if not os.path.isdir(self.root):
+            return []
+        return [os.path.join(self.root, d) for d in os.listdir(self.root)
+                if len(d) == 2 and os.path.isdir(os.path.join(self.root, d))]
+
+    def _expired(self, key):
+        try:
+            used = os.path.getmtime(os.path.join(self._entry_dir(key), "result.pkl"))
+        except OSError:
+            return True
+        return time.time() - used > self.max_age_s
+
+    def _touch(self, key):
+        try:
+            os.utime(os.path.join(self._entry_dir(key), "result.pkl"))
+        except OSError:
+            pass
+
+    def _load(self, key):
+        """(payload with resolved artifact paths, artifact paths) or None."""
+        folder = self._entry_dir(key)
+        if self._expired(key):
+            shutil.rmtree(folder, ignore_errors=True)
+            return None
+        try:
+            with open(os.path.join(folder, "result.pkl"), "rb") as f:
+                stored = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        artifacts = []
+
+        def resolve(s):
+            if not s.startswith(ARTIFACT_PREFIX):
+                return s
+            artifacts.append(os.path.join(folder, s[len(ARTIFACT_PREFIX):]))
+            return artifacts[-1]
+
+        payload = _map_strings(stored, resolve)
+        if not all(os.path.exists(p) for p in artifacts):
+            return None
+        return payload, artifacts
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
@@ -0,0 +1,124 @@
+"""
+Single-flight coalescing of identical concurrent calls.
+
+When several users submit the same request at once (e.g. the default
+Gradio prompt), only the first starts the computation; the others join it
+and all get the same result or exception. The computation runs on an
+executor thread, not in any caller's thread, so callers can leave early:
+once every waiter has left, the flight's cancel event is set (the function
+may poll it) and, if it has not started yet, it never runs. A finished
+flight is forgotten, so later identical calls start afresh (the result
+cache, not this, is what remembers results). With a context_factory each
+flight also carries a shared context (e.g. a core.progress.ProgressContext
+on its cancel event) that every waiter can read.
+"""
+import contextlib
+import hashlib
+import json
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+from core.result_cache import normalize
+
+
+def flight_key(task_type, params):
+    """Canonical key of a TaskSpec (task_type + normalized parameters)."""
+    blob = json.dumps({"task_type": task_type, "params": normalize(params or {})},
+                      sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class Flight:
+    """One in-flight computation shared by `waiters` callers."""
+
+    def __init__(self, key):
+        self.key = key
+        self.future = None
+        self.cancel_event = threading.Event()
+        self.context = None                     # shared by the waiters (context_factory)
+        self.waiters = 0
+
+    def result(self, timeout=None, cancel=None, poll_s=0.1):
+        """
+        The shared result (or exception). With a cancel event the wait is
+        abandoned with CancelledError as soon as it is set.
+        """
+        if cancel is None:
+            return self.future.result(timeout)
+        waited = 0.0
+        while True:
+            if cancel.is_set():
+                raise CancelledError(f"left flight {self.key[:12]}")
+            try:
+                return self.future.result(poll_s)
+            except TimeoutError:
+                waited += poll_s
+                if timeout is not None and waited >= timeout:
+                    raise
+
+
+class SingleFlight:
+    """
+    with flights.join(key, fn) as flight: result = flight.result()
+    fn(flight) runs once per key while at least one caller waits; it may poll
+    flight.cancel_event.
+    """
+
+    def __init__(self, max_workers=None):
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="single-flight")
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.started = 0
+        self.coalesced = 0
+        self.cancelled = 0
+
+    @contextlib.contextmanager
+    def join(self, key, fn, context_factory=None):
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = Flight(key)
+                if context_factory is not None:
+                    flight.context = context_factory(flight.cancel_event)
+                flight.future = self._executor.submit(self._run, flight, fn)
+                self.started += 1
+            else:
+                self.coalesced += 1
+            flight.waiters += 1
+        try:
+            yield flight
+        finally:
+            self._leave(flight)
+
+    def do(self, key, fn, timeout=None, cancel=None):
+        """Blocking join(): fn's shared result."""
+        with self.join(key, fn) as flight:
+            return flight.result(timeout, cancel)
+
+    def in_flight(self):
+        with self._lock:
+            return {k: f.waiters for k, f in self._flights.items()}
+
+    def stats(self):
+        return {"started": self.started, "coalesced": self.coalesced,
+                "cancelled": self.cancelled, "in_flight": len(self._flights)}
+
+    def _leave(self, flight):
+        with self._lock:
+            flight.waiters -= 1
+            abandoned = flight.waiters == 0 and not flight.future.done()
+            if abandoned:
+                self.cancelled += 1
+                if self._flights.get(flight.key) is flight:
+                    del self._flights[flight.key]      # a new caller starts afresh
+        if abandoned:
+            flight.cancel_event.set()
+            flight.future.cancel()                     # only succeeds if not started
+
+    def _run(self, flight, fn):
+        try:
+            return fn(flight)
+        finally:
+            with self._lock:
+                if self._flights.get(flight.key) is flight:
+                    del self._flights[flight.key]
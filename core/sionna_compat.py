@@ -17,3 +17,39 @@ def phy_imports():
     from sionna.channel import AWGN, FlatFadingChannel
     from sionna.utils import ebnodb2no
     return Constellation, Mapper, Demapper, AWGN, FlatFadingChannel, ebnodb2no
+
+
+def sionna_phy_version():
+    """
+    1 for the Sionna >=1.0 layout (sionna.phy, layers called as f(x, no)),
+    0 for the legacy 0.x layout (Keras layers called as f([x, no])).
+    """
+    try:
+        import sionna.phy  # noqa: F401
+        return 1
+    except Exception:
+        return 0
+
+
+def select_backend(backend="auto"):
+    """
+    Resolves the simulation backend for the PHY tools: "numpy" or "sionna".
+
+    "auto" picks Sionna only when it is installed and a GPU is visible;
+    on CPU-only nodes the NumPy backend (core.numpy_phy) is faster and
+    avoids the multi-second TensorFlow import.
+    """
+    import importlib.util
+    import os
+
+    backend = (backend or "auto").lower()
+    if backend in ("numpy", "sionna"):
+        return backend
+    if backend != "auto":
+        raise ValueError(f"Unknown backend: {backend} (use 'auto', 'numpy' or 'sionna')")
+
+    has_sionna = importlib.util.find_spec("sionna") is not None \
+        and importlib.util.find_spec("tensorflow") is not None
+    cuda_env = os.environ.get("CUDA_VISIBLE_DEVICES")
+    has_gpu = os.path.exists("/dev/nvidia0") and cuda_env not in ("", "-1")
+    return "sionna" if has_sionna and has_gpu else "numpy"
@@ -0,0 +1,291 @@
+"""
+Long-lived simulation workers fed over a local queue.
+
+Every tool call in a fresh process pays for the TensorFlow/Sionna import,
+layer construction and graph tracing before it simulates anything. A
+WorkerPool keeps n_workers spawned processes alive instead: each imports
+the tool registry once, optionally warms the Sionna stack (see WARM_CALLS),
+and then serves (tool_name, params) jobs, so the layers and compiled graphs
+in core.layer_cache survive from one request to the next.
+
+SimulationAgent(worker_pool=...) routes its local tool calls through it.
+The pool starts lazily on the first call, so it can be created at import
+time (e.g. in the Gradio app) without spawning anything.
+
+submit(..., progress=ctx) tracks a call with a core.progress.ProgressContext:
+the worker forwards the tool's progress snapshots (at most every
+PROGRESS_INTERVAL_S) into ctx, and setting ctx.cancel_event sets the
+worker's cancel flag to that job id, so the tool stops at its next check.
+"""
+import atexit
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+
+from core import progress
+from core.logger import setup_logger
+
+# Tiny Sionna calls run at worker start-up: they import TF, build the common
+# mappers/channels and trace the default-batch BER sweep graph
+WARM_MODULATIONS = ("qpsk", "16qam")
+WARM_CALLS = (
+    ("simulate_constellation", {"n_symbols": 16}),
+    ("simulate_ber", {"channel": "awgn", "snr_db_list": [0.0], "n_bits": 1}),
+)
+PROGRESS_INTERVAL_S = 0.25
+
+
+class _CancelFlag:
+    """Event-like view of a worker's shared cancel flag for one job id."""
+
+    def __init__(self, flag, job_id):
+        self.flag = flag
+        self.job_id = job_id
+
+    def is_set(self):
+        return self.flag.value == self.job_id
+
+
+def _warm(registry, modulations):
+    """Runs WARM_CALLS on the Sionna backend; returns the seconds spent."""
+    t0 = time.perf_counter()
+    out_dir = tempfile.mkdtemp(prefix="warm_")
+    for mod in modulations:
+        for tool_name, params in WARM_CALLS:
+            registry[tool_name](modulation=mod, backend="sionna", out_dir=out_dir, **params)
+    return time.perf_counter() - t0
+
+
+def _worker_main(jobs, results, cancel_flag, warm_sionna, modulations):
+    """Worker loop: warm up once, then serve jobs until a None sentinel."""
+    import matplotlib
+    matplotlib.use("Agg")                   # no display in a worker
+
+    from core.local_tools import LOCAL_TOOL_REGISTRY
+    from core.sionna_compat import select_backend
+
+    if warm_sionna is None:
+        warm_sionna = select_backend("auto") == "sionna"
+    warm_s = 0.0
+    if warm_sionna:
+        try:
+            warm_s = _warm(LOCAL_TOOL_REGISTRY, modulations)
+        except Exception:
+            pass                            # tools report Sionna import errors per call
+    results.put(("ready", os.getpid(), warm_s))
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, tool_name, params, tracked = job
+        results.put(("started", job_id, os.getpid()))
+        ctx = None
+        if tracked:
+            ctx = progress.ProgressContext(
+                _CancelFlag(cancel_flag, job_id), min_interval_s=PROGRESS_INTERVAL_S,
+                on_update=lambda snap, j=job_id: results.put(("progress", j, snap)))
+        try:
+            with progress.activate(ctx):
+                payload = LOCAL_TOOL_REGISTRY[tool_name](**params)
+            if ctx is not None:
+                results.put(("progress", job_id, ctx.snapshot()))     # final counts
+            results.put(("done", job_id, payload))
+        except progress.Cancelled:
+            results.put(("cancelled", job_id, None))
+        except Exception as e:
+            results.put(("failed", job_id, f"{type(e).__name__}: {e}"))
+
+
+class WorkerPool:
+    """
+    pool.call(tool_name, params) -> payload, run by a warm worker process.
+    Tool exceptions are re-raised as RuntimeError (core.progress.Cancelled
+    for a cancelled call); a worker that dies fails its job and is replaced.
+    """
+
+    def __init__(self, n_workers=1, warm_sionna=None, warm_modulations=WARM_MODULATIONS):
+        self.n_workers = n_workers
+        self.warm_sionna = warm_sionna          # None: only if the Sionna backend is selected
+        self.warm_modulations = tuple(warm_modulations)
+        self.logger = setup_logger("WorkerPool")
+
+        self._ctx = mp.get_context("spawn")
+        self._jobs = None
+        self._results = None
+        self._procs = []
+        self._flags = {}                        # worker pid -> shared cancel flag (job id)
+        self._futures = {}                      # job_id -> Future
+        self._running = {}                      # job_id -> worker pid
+        self._tracked = {}                      # job_id -> ProgressContext
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._ready = threading.Semaphore(0)
+        self._listener = None
+        self._closed = False
+
+    # ---- lifecycle ----
+    @property
+    def started(self):
+        return self._listener is not None
+
+    def start(self, wait=True):
+        """Spawns the workers (idempotent); wait=True blocks until they are warm."""
+        with self._lock:
+            if self.started:
+                return self
+            if self._closed:
+                raise RuntimeError("WorkerPool is closed")
+            self._jobs = self._ctx.Queue()
+            self._results = self._ctx.Queue()
+            for _ in range(self.n_workers):
+                self._spawn()
+            self._listener = threading.Thread(target=self._listen, name="WorkerPool-results",
+                                              daemon=True)
+            self._listener.start()
+            atexit.register(self.close)
+        if wait:
+            for _ in range(self.n_workers):
+                self._ready.acquire()
+        return self
+
+    def close(self, timeout=5.0):
+        """Stops the workers; pending jobs fail."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            procs = list(self._procs)
+        if not procs:
+            return
+        for _ in procs:
+            self._jobs.put(None)
+        for p in procs:
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
+        self._fail_all("WorkerPool closed")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- jobs ----
+    def submit(self, tool_name, params=None, progress=None):
+        """
+        Queues one tool call; returns a concurrent.futures.Future of the
+        payload. progress: ProgressContext to fill in and to cancel through.
+        """
+        self.start(wait=False)
+        fut = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("WorkerPool is closed")
+            job_id = next(self._ids)
+            self._futures[job_id] = fut
+            if progress is not None:
+                self._tracked[job_id] = progress
+        self._jobs.put((job_id, tool_name, dict(params or {}), progress is not None))
+        return fut
+
+    def call(self, tool_name, params=None, timeout=None, progress=None):
+        """Blocking submit(): the tool's payload."""
+        return self.submit(tool_name, params, progress).result(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {"workers": sum(p.is_alive() for p in self._procs),
+                    "pending": len(self._futures), "running": len(self._running)}
+
+    # ---- internals ----
+    def _spawn(self):
+        flag = self._ctx.Value("q", -1, lock=False)
+        p = self._ctx.Process(target=_worker_main, name="sim-worker",
+                              args=(self._jobs, self._results, flag, self.warm_sionna,
+                                    self.warm_modulations))
+        p.start()
+        self._procs.append(p)
+        self._flags[p.pid] = flag
+
+    def _listen(self):
+        """Resolves futures from worker messages; replaces dead workers."""
+        while True:
+            try:
+                kind, a, b = self._results.get(timeout=0.2)
+            except queue.Empty:
+                if self._closed:
+                    return
+                self._reap()
+                self._forward_cancels()
+                continue
+            except (EOFError, OSError):
+                return
+            self._forward_cancels()
+
+            if kind == "ready":
+                self.logger.info(f"Worker {a} ready (warm-up {b:.1f} s)")
+                self._ready.release()
+                continue
+            with self._lock:
+                if kind == "progress":
+                    ctx = self._tracked.get(a)
+                    if ctx is not None:
+                        ctx.load(b)
+                    continue
+                if kind == "started":
+                    self._running[a] = b
+                    continue
+                self._running.pop(a, None)
+                self._tracked.pop(a, None)
+                fut = self._futures.pop(a, None)
+            if fut is None:
+                continue
+            if kind == "done":
+                fut.set_result(b)
+            elif kind == "cancelled":
+                fut.set_exception(progress.Cancelled(f"tool call {a} cancelled"))
+            else:
+                fut.set_exception(RuntimeError(b))
+
+    def _forward_cancels(self):
+        """Points the cancel flag of a worker at its job once that job's context is cancelled."""
+        with self._lock:
+            for job_id, ctx in self._tracked.items():
+                pid = self._running.get(job_id)
+                if pid is not None and ctx.cancel_event.is_set() and pid in self._flags:
+                    self._flags[pid].value = job_id
+
+    def _reap(self):
+        with self._lock:
+            dead = [p for p in self._procs if not p.is_alive()]
+            if not dead or self._closed:
+                return
+            for p in dead:
+                self._procs.remove(p)
+                self._flags.pop(p.pid, None)
+                lost = [j for j, pid in self._running.items() if pid == p.pid]
+                for j in lost:
+                    del self._running[j]
+                    self._tracked.pop(j, None)
+                    fut = self._futures.pop(j, None)
+                    if fut is not None:
+                        fut.set_exception(RuntimeError(
+                            f"Simulation worker {p.pid} died (exit code {p.exitcode})"))
+                self.logger.warning(f"Worker {p.pid} exited ({p.exitcode}); restarting")
+                self._spawn()
+
+    def _fail_all(self, reason):
+        with self._lock:
+            futures = list(self._futures.values())
+            self._futures.clear()
+            self._running.clear()
+            self._tracked.clear()
+        for fut in futures:
+            fut.set_exception(RuntimeError(reason))
@@ -0,0 +1,63 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import tempfile
+from tools.simulate_ber import simulate_ber
+from tools.simulate_ber_mimo import simulate_ber_mimo
+
+
+def _overlap(a, b):
+    return a[0] <= b[1] and b[0] <= a[1]
+
+
+def _compare(name, k_np, k_sn):
+    """Per-point check that the two backends' confidence intervals overlap."""
+    ok = True
+    for snr, ci_np, ci_sn, ber_np, ber_sn in zip(k_np["snr_db"], k_np["ber_ci"], k_sn["ber_ci"],
+                                                 k_np["ber"], k_sn["ber"]):
+        match = _overlap(ci_np, ci_sn)
+        ok &= match
+        print(f"   {name:<22} {snr:>5} dB  numpy={ber_np:.3e}  sionna={ber_sn:.3e}  "
+              f"-> {'OK' if match else 'MISMATCH'}")
+    return ok
+
+
+def run_parity(n_bits=200000, seed=0):
+    """
+    Runs the BER tools on both backends and checks the NumPy backend is
+    statistically equivalent to Sionna (overlapping 99% Wilson intervals).
+    """
+    out_dir = tempfile.mkdtemp()
+    common = dict(n_bits=n_bits, confidence=0.99, out_dir=out_dir)
+    all_ok = True
+
+    print("\n--- Backend parity (numpy vs sionna) ---\n")
+
+    for mod in ["qpsk", "16qam"]:
+        for channel in ["awgn", "rayleigh"]:
+            k_np = simulate_ber(mod, channel, backend="numpy", seed=seed, **common)
+            k_sn = simulate_ber(mod, channel, backend="sionna", **common)
+            if "error" in k_sn:
+                print(f"Sionna backend unavailable: {k_sn['error']}")
+                return False
+            all_ok &= _compare(f"{mod}/{channel}", k_np["kpis"], k_sn["kpis"])
+
+    configs = [{"nt": 1, "nr": 1}, {"nt": 2, "nr": 4}, {"nt": 4, "nr": 4}]
+    for demapper in ["hard", "maxlog"]:
+        r_np = simulate_ber_mimo("16qam", configs=configs, demapper=demapper,
+                                 backend="numpy", seed=seed, **common)["kpis"]
+        r_sn = simulate_ber_mimo("16qam", configs=configs, demapper=demapper,
+                                 backend="sionna", **common)["kpis"]
+        for label in r_np["ber"]:
+            all_ok &= _compare(f"mimo {label}/{demapper}",
+                               {"snr_db": r_np["snr_db"], "ber": r_np["ber"][label],
+                                "ber_ci": r_np["ber_ci"][label]},
+                               {"snr_db": r_sn["snr_db"], "ber": r_sn["ber"][label],
+                                "ber_ci": r_sn["ber_ci"][label]})
+
+    print(f"\nParity: {'OK' if all_ok else 'MISMATCH'}")
+    return all_ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_parity() else 1)
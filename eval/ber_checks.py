@@ -0,0 +1,74 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import tempfile
+import types
+
+import numpy as np
+from core.ber_stats import StoppingRule
+from tools import simulate_ber as ber_tool
+
+
+def check_compiled_rounds():
+    """
+    _run_compiled with target_errors + ci_rel_width: once target_errors is
+    reached the points still wait on the CI, and the rounds must keep
+    doubling (O(log) graph calls), not drop to one batch per call.
+    """
+    k, batch_size, ber = 2, 1000, 1e-2
+    rounds = []
+
+    class _Errors:
+        def __init__(self, value):
+            self.value = value
+
+        def numpy(self):
+            return self.value
+
+    def count_errors(no, n_iter):
+        # Deterministic stand-in for the graph: BER * bits errors per point
+        rounds.append(int(n_iter))
+        return _Errors(np.full(len(no), int(ber * int(n_iter) * batch_size * k), dtype=np.int64))
+
+    tf = types.SimpleNamespace(constant=np.asarray)
+    rule = StoppingRule(target_errors=100, ci_rel_width=0.05, max_bits=10**8)
+    counts = ber_tool._run_compiled(tf, count_errors, k, batch_size, [0.1, 0.2], rule)
+
+    ok = all(rule.done(e, b) for e, b in counts) and len(rounds) <= 15
+    print(f"   compiled rounds (target_errors + ci_rel_width): {len(rounds)} graph calls, "
+          f"batches {rounds}  -> {'OK' if ok else 'TOO MANY ROUNDS'}")
+    return ok
+
+
+def check_importance_sampling_backend():
+    """
+    importance_sampling only runs on NumPy: an explicit Sionna request
+    (backend / compiled / xla) is an error, and "auto" reports the backend used.
+    """
+    common = dict(modulation="qpsk", channel="awgn", snr_db_list=[10], n_bits=20000,
+                  importance_sampling=True, seed=0, out_dir=tempfile.mkdtemp())
+    all_ok = True
+    for kwargs in [{"backend": "sionna"}, {"compiled": True}, {"xla": True}]:
+        result = ber_tool.simulate_ber(**common, **kwargs)
+        ok = result["plots"] == [] and "error" in result
+        all_ok &= ok
+        print(f"   importance_sampling + {kwargs}: {result.get('error')}  -> {'OK' if ok else 'FAILED'}")
+
+    kpis = ber_tool.simulate_ber(**common, backend="auto")["kpis"]
+    ok = kpis["backend"] == "numpy" and kpis["importance_sampling"] is True
+    all_ok &= ok
+    print(f"   importance_sampling + auto: backend={kpis['backend']}"
+          f"{', note: ' + kpis['note'] if 'note' in kpis else ''}  -> {'OK' if ok else 'FAILED'}")
+    return all_ok
+
+
+def run_checks():
+    print("\n--- BER tool checks ---\n")
+    all_ok = check_compiled_rounds()
+    all_ok &= check_importance_sampling_backend()
+    print(f"\nBER checks: {'OK' if all_ok else 'FAILED'}")
+    return all_ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_checks() else 1)
@@ -0,0 +1,43 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import tempfile
+from tools.simulate_multi_radio_map import (
+    simulate_multi_radio_map, simulate_multi_radio_map_progressive
+)
+
+
+def check_invalid_modes():
+    """Unknown combine_mode / sum_method give an error payload, never an exception."""
+    out_dir = tempfile.mkdtemp()
+    cases = [
+        {"combine_mode": "average"},
+        {"combine_mode": "sum", "sum_method": "log"},
+        {"combine_mode": "average", "frequency_hz": [2e9, 3.5e9]},
+    ]
+    all_ok = True
+    for kwargs in cases:
+        for name, call in [
+            ("simulate_multi_radio_map", lambda: simulate_multi_radio_map(out_dir=out_dir, **kwargs)),
+            ("progressive", lambda: list(simulate_multi_radio_map_progressive(out_dir=out_dir, **kwargs))[-1]),
+        ]:
+            try:
+                result = call()
+                ok = result.get("plots") == [] and "error" in result
+                detail = result.get("error")
+            except Exception as e:
+                ok, detail = False, f"raised {type(e).__name__}: {e}"
+            all_ok &= ok
+            print(f"   {name:<24} {kwargs}: {detail}  -> {'OK' if ok else 'FAILED'}")
+    return all_ok
+
+
+def run_checks():
+    print("\n--- Radio map tool checks ---\n")
+    all_ok = check_invalid_modes()
+    print(f"\nRadio map checks: {'OK' if all_ok else 'FAILED'}")
+    return all_ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_checks() else 1)
@@ -0,0 +1,53 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be loaded by `import main` (they load on first tool call)
+HEAVY_MODULES = ["matplotlib", "numpy", "tensorflow", "sionna", "requests", "gradio",
+                 "tools.simulate_ber"]
+
+
+def _time_import(stmt="import main"):
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "-c", stmt], cwd=ROOT, check=True)
+    return time.perf_counter() - t0
+
+
+def _loaded_heavy_modules():
+    code = ("import sys, main; "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True,
+                         capture_output=True, text=True).stdout.strip()
+    return [m for m in out.split(",") if m]
+
+
+def run_benchmark(budget_s=0.25, repeats=5):
+    """
+    Cold-start check: median wall time of `python -c "import main"` in a
+    fresh interpreter (minus the bare interpreter start-up) must stay under
+    budget_s, and the import must not pull in the simulation stack.
+    """
+    print("\n--- Startup benchmark ---\n")
+
+    baseline = statistics.median(_time_import("pass") for _ in range(repeats))
+    total = statistics.median(_time_import() for _ in range(repeats))
+    cost = total - baseline
+    print(f"   interpreter start-up : {baseline * 1e3:7.1f} ms")
+    print(f"   import main          : {total * 1e3:7.1f} ms  (+{cost * 1e3:.1f} ms, "
+          f"budget {budget_s * 1e3:.0f} ms)")
+
+    heavy = _loaded_heavy_modules()
+    print(f"   heavy modules loaded : {', '.join(heavy) if heavy else 'none'}")
+
+    ok = cost <= budget_s and not heavy
+    print(f"\nStartup: {'OK' if ok else 'OVER BUDGET'}")
+    return ok
+
+
+if __name__ == "__main__":
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 0.25
+    sys.exit(0 if run_benchmark(budget) else 1)
@@ -1,6 +1,9 @@
 from core.task_decomposer import TaskDecomposer
 from core.mcp_client import MCPClient
 from core.session_store import SessionStore
+from core.worker_pool import WorkerPool
+from core.result_cache import ResultCache
+from core.jobs import JobQueue, TASK_PRIORITY, TERMINAL, progress_text
 
 from agents.interpreter_agent import InterpreterAgent
 from agents.parameter_extractor_agent import ParameterExtractorAgent
@@ -9,14 +12,27 @@ from agents.summary_agent import SummaryAgent
 
 
 class TelecomMultiAgentAssistant:
-    def __init__(self, mcp_url="http://localhost:8080"):
+    def __init__(self, mcp_url="http://localhost:8080", use_worker_pool=False,
+                 use_result_cache=False, use_point_store=False, coalesce=False, job_workers=2):
         self.decomposer = TaskDecomposer()
         self.mcp = MCPClient(mcp_url)
         self.memory = SessionStore(maxlen=5)
+        # Background jobs (submit/job_status/cancel): job_workers threads for any
+        # job plus one kept for interactive jobs
+        self.jobs = JobQueue(max_workers=job_workers + 1, reserved=1)
+        # Warm simulation workers, started on the first tool call (one per job thread)
+        self.pool = WorkerPool(n_workers=job_workers + 1) if use_worker_pool else None
+        # Repeated requests are answered from disk/memory without re-simulating
+        self.cache = ResultCache() if use_result_cache else None
 
         self.interpreter = InterpreterAgent(self.decomposer)
         self.extractor = ParameterExtractorAgent(self.decomposer)
-        self.simulator = SimulationAgent(use_mcp=False)
+        # Follow-up BER requests (extend / refine the sweep) reuse stored points
+        self.simulator = SimulationAgent(mcp_client=self.mcp, use_mcp=False,
+                                         worker_pool=self.pool,
+                                         result_cache=self.cache,
+                                         point_store=True if use_point_store else None,
+                                         coalesce=coalesce)
         self.summarizer = SummaryAgent()
 
     def chat(self, prompt: str):
@@ -24,23 +40,114 @@ class TelecomMultiAgentAssistant:
         task = self.extractor.run(task)
         task, result = self.simulator.run(task)
         summary = self.summarizer.run(task, result)
+        self._remember(prompt, task, result)
+        return summary, result.payload if result.ok else {}
+
+    async def achat(self, prompt: str):
+        """
+        Async chat(): the tool call awaits (async MCP, local tools on an
+        executor, bounded per tool), so one event loop can serve many
+        sessions at once. Interpreting and summarizing are cheap and inline.
+        """
+        task = self.interpreter.run(prompt)
+        task = self.extractor.run(task)
+        task, result = await self.simulator.arun(task)
+        summary = self.summarizer.run(task, result)
+        self._remember(prompt, task, result)
+        return summary, result.payload if result.ok else {}
+
+    def chat_stream(self, prompt: str):
+        """
+        Generator version of chat(): yields (summary, payload) for every
+        preview a progressive tool produces; the last yield is the final result.
+        """
+        task = self.interpreter.run(prompt)
+        task = self.extractor.run(task)
+
+        result = None
+        for task, result in self.simulator.run_stream(task):
+            summary = self.summarizer.run(task, result)
+            yield summary, result.payload if result.ok else {}
+        self._remember(prompt, task, result)
 
+    def _remember(self, prompt, task, result):
         self.memory.add({
             "prompt": prompt,
             "task_type": task.task_type,
             "params": task.parameters,
             "tool": task.tool_name,
-            "result_ok": result.ok
+            "result_ok": result.ok if result is not None else False
         })
 
-        return summary, result.payload if result.ok else {}
+    # ---- background jobs ----
+    def submit(self, prompt: str, priority=None):
+        """
+        Queues the request and returns a job id at once. The priority
+        defaults to the task's class (core.jobs.TASK_PRIORITY): constellation
+        plots run ahead of BER sweeps.
+        """
+        task = self.interpreter.run(prompt)
+        task = self.extractor.run(task)
+        priority = priority or TASK_PRIORITY.get(task.task_type, "normal")
+        return self.jobs.submit(self._run_job, prompt, task, priority=priority,
+                                label=task.task_type)
+
+    def _run_job(self, job, prompt, task):
+        """Job body: like chat_stream(), previews go to job.partial."""
+        result = None
+        for task, result in self.simulator.run_stream(task, progress=job.progress):
+            job.partial = (self.summarizer.run(task, result), result.payload if result.ok else {})
+        self._remember(prompt, task, result)
+        return job.partial
+
+    def job_status(self, job_id):
+        """Status dict: state, timings and bits/errors done per SNR point."""
+        return self.jobs.status(job_id)
+
+    def job_result(self, job_id, timeout=None):
+        """(summary, payload) once the job has finished, else None."""
+        job = self.jobs.wait(job_id, timeout)
+        return job.result if job.status in TERMINAL else None
+
+    def watch(self, job_id, interval_s=0.5):
+        """Streams job_status() until the job ends."""
+        return self.jobs.watch(job_id, interval_s)
+
+    def cancel(self, job_id):
+        return self.jobs.cancel(job_id)
+
+    def close(self):
+        self.jobs.close()
+        self.simulator.close()
+        if self.pool is not None:
+            self.pool.close()
+
+    async def aclose(self):
+        await self.mcp.aclose()
+        self.close()
 
 
 if __name__ == "__main__":
-    assistant = TelecomMultiAgentAssistant()
+    assistant = TelecomMultiAgentAssistant(use_worker_pool=True, use_result_cache=True,
+                                           use_point_store=True)
+    assistant.pool.start(wait=False)        # warm up while the user types
     while True:
         prompt = input("\nYou: ")
         if prompt.strip().lower() in {"exit", "quit"}:
             break
-        summary, payload = assistant.chat(prompt)
+        # Runs as a job: progress is streamed, Ctrl+C cancels it
+        job_id = assistant.submit(prompt)
+        try:
+            for status in assistant.watch(job_id, interval_s=1.0):
+                if status["status"] not in TERMINAL:
+                    print(progress_text(status))
+        except KeyboardInterrupt:
+            assistant.cancel(job_id)
+            print("\nCancelling...")
+        status = assistant.jobs.wait(job_id).snapshot()
+        if status["status"] != "done":
+            print("\nAssistant:\n", progress_text(status))
+            continue
+        summary, payload = assistant.job_result(job_id)
         print("\nAssistant:\n", summary)
+    assistant.close()
@@ -1,98 +1,507 @@
 import os
 import numpy as np
 import matplotlib.pyplot as plt
-from core.sionna_compat import phy_imports
+from core.plotting import plot_lock
+from core.sionna_compat import phy_imports, sionna_phy_version, select_backend
+from core import numpy_phy as nphy
+from core.ber_stats import StoppingRule, WeightedCounts, run_until, point_kpis
+from core.parallel import run_tasks, spawn_seeds, resolve_workers
+from core import batch_tuning, progress
+from core.layer_cache import layer_cache
+from core.point_store import PointCounts, open_store
+
+# Deep-fade bias for importance sampling: theta = factor * 2 no / d_min^2
+IS_FADE_FACTOR = 4.0
 
 def simulate_ber(
-    modulation: str = "qpsk",
+    modulation="qpsk",             # one modulation or a list, e.g. ["qpsk","16qam"]
     channel: str = "awgn",          # "awgn" or "rayleigh"
     snr_db_list=None,              # e.g. [-5,0,5,10,15]
     n_bits: int = 200000,
     batch_size: int = 2000,
+    target_errors=None,            # adaptive stop: errors per point
+    ci_rel_width=None,             # adaptive stop: (CI width / BER) per point
+    min_bits=None,
+    max_bits=None,                 # adaptive budget per point (default n_bits)
+    ber_floor=None,                # stop the sweep once BER < floor
+    confidence: float = 0.95,
+    demapper: str = "app",         # "app" (exact) or "maxlog"
+    importance_sampling: bool = False,  # IS estimator for the high-SNR points (NumPy backend)
+    n_workers=None,                # NumPy backend: parallel SNR points (-1 = all cores)
+    memory_budget_mb=None,         # auto-tune batch_size to this budget (MB, or "auto")
+    autotune_warmup: bool = False, # refine the tuned batch with a short timed warm-up (NumPy)
+    point_store=None,              # NumPy backend: reuse per-point counts (True or sqlite path)
+    compiled=None,                 # None = auto (Sionna >= 1.0), True/False to force
+    xla: bool = False,             # jit_compile the compiled graph (CPU XLA)
+    backend: str = "auto",         # "auto", "numpy" or "sionna"
+    seed=None,                     # NumPy backend RNG seed
     out_dir: str = "outputs"
 ):
+    """
+    BER vs SNR for one modulation (or a list, compared under common random
+    numbers) over AWGN or flat Rayleigh fading.
+
+    - target_errors / ci_rel_width / ber_floor: adaptive stopping per point
+    - importance_sampling: unbiased BER far below 1e-6 (NumPy backend)
+    - n_workers: SNR points on a process pool, same results for any count
+    - memory_budget_mb / autotune_warmup: choose batch_size automatically
+    - point_store: reuse stored per-point counts across calls
+    - compiled / xla: whole sweep as one tf.function (Sionna backend)
+
+    See "BER simulation options" in README.md for the details.
+    """
     os.makedirs(out_dir, exist_ok=True)
     if snr_db_list is None:
         snr_db_list = [-5, 0, 5, 10, 15]
 
+    # One modulation or a list compared under common random numbers
+    single = isinstance(modulation, str)
+    mods = [modulation] if single else list(modulation)
+
+    # bits per symbol k
+    ks = [nphy.bits_per_symbol(m) for m in mods]
+    if None in ks:
+        return {"plots": [], "kpis": {}, "error": f"Unknown modulation: {mods[ks.index(None)]}"}
+
+    requested = (backend or "auto").lower()
+    try:
+        backend = select_backend(backend)
+    except ValueError as e:
+        return {"plots": [], "kpis": {}, "error": str(e)}
+
+    # Importance sampling is only implemented on the NumPy draws
+    note = None
+    if importance_sampling:
+        if requested == "sionna" or compiled or xla:
+            return {"plots": [], "kpis": {},
+                    "error": "importance_sampling runs on the NumPy backend only "
+                             "(drop backend='sionna', compiled and xla)"}
+        if backend == "sionna":
+            note = "importance_sampling runs on the NumPy backend (auto would have picked Sionna)"
+        backend = "numpy"
+
+    fading = (channel.lower() == "rayleigh")
+    demapper = demapper.lower()
+    if demapper not in ("app", "maxlog"):
+        return {"plots": [], "kpis": {}, "error": f"Unknown demapper: {demapper} (use 'app' or 'maxlog')"}
+
+    rule = StoppingRule(n_bits=n_bits, target_errors=target_errors,
+                        ci_rel_width=ci_rel_width, min_bits=min_bits,
+                        max_bits=max_bits, confidence=confidence)
+
+    if n_workers is not None and backend != "numpy":
+        return {"plots": [], "kpis": {}, "error": "n_workers needs the NumPy backend"}
+
+    if memory_budget_mb is not None:
+        batch_size = _tune_batch_size(ks, fading, demapper, importance_sampling, backend,
+                                      snr_db_list, rule, n_workers, memory_budget_mb,
+                                      autotune_warmup, confidence)
+
+    # Stored per-point counts: the run starts from them with fresh draws
+    store = open_store(point_store) if backend == "numpy" else None
+    prior, run_seed = None, seed
+    if store is not None:
+        scenarios = [store.scenario("simulate_ber", k=k, fading=fading, demapper=demapper,
+                                    importance_sampling=importance_sampling, seed=seed)
+                     for k in ks]
+        stored = [store.load(sc, snr_db_list) for sc in scenarios]
+        prior = [[st[snr_db] for snr_db in snr_db_list] for st in stored]
+        run_seed = store.seed_sequence(seed, scenarios)
+
+    progress.begin(snr_db_list, series=mods)
+    if n_workers is not None:
+        # One task per SNR point, each with its own SeedSequence child
+        root, seeds = spawn_seeds(run_seed, len(snr_db_list))
+        tasks = [(ks, fading, batch_size, [snr_db], rule, None, confidence, sd, demapper,
+                  importance_sampling, None if prior is None else [[p[j]] for p in prior], [j])
+                 for j, (snr_db, sd) in enumerate(zip(snr_db_list, seeds))]
+
+        floor_at = {}                       # modulation -> first SNR index below ber_floor
+
+        def point_done(j, pt):
+            for i, points in enumerate(pt):
+                progress.report(i, j, points[0]["bits"], points[0]["errors"])
+                if ber_floor is not None and points[0]["ber"] < ber_floor:
+                    floor_at[i] = min(j, floor_at.get(i, j))
+            progress.check_cancelled()
+            # Points past every modulation's floor are not needed
+            if len(floor_at) == len(ks):
+                return range(max(floor_at.values()) + 1, len(snr_db_list))
+
+        per_point = run_tasks(_run_numpy, tasks, n_workers, on_done=point_done)
+        results = [_truncate([pt[i][0] if pt is not None else None for pt in per_point],
+                             ber_floor) for i in range(len(ks))]
+    elif backend == "numpy":
+        results = _run_numpy(ks, fading, batch_size, snr_db_list, rule, ber_floor,
+                             confidence, run_seed, demapper, importance_sampling, prior)
+    else:
+        results = []
+        for i, k in enumerate(ks):
+            points = _run_sionna(k, fading, batch_size, snr_db_list, rule, ber_floor,
+                                 confidence, compiled, xla, demapper)
+            if isinstance(points, str):
+                return {"plots": [], "kpis": {}, "error": points}
+            results.append(points)
+            for j, p in enumerate(points):
+                progress.report(i, j, p["bits"], p["errors"])
+
+    if store is not None:
+        for sc, points, start in zip(scenarios, results, prior):
+            store.add(sc, {snr_db: PointCounts(p["errors"], p["bits"], p.get("s1", 0.0),
+                                               p.get("s2", 0.0)).minus(p0)
+                           for snr_db, p, p0 in zip(snr_db_list, points, start)})
+
+    theory = [nphy.qam_ber_theory(k, snr_db_list, fading) for k in ks]
+
+    # Plot
+    with plot_lock:
+        fig = plt.figure()
+        for m, points, th in zip(mods, results, theory):
+            line, = plt.semilogy(snr_db_list[:len(points)], [p["ber"] for p in points], marker="o",
+                                 label=m.upper())
+            plt.semilogy(snr_db_list, th, linestyle="--", color=line.get_color(),
+                         label=f"{m.upper()} theory")
+        title = "/".join(m.upper() for m in mods)
+        plt.title(f"BER vs SNR ({title} - {channel.upper()})")
+        plt.xlabel("SNR (dB)")
+        plt.ylabel("BER")
+        plt.grid(True, which="both")
+        plt.legend()
+
+        tag = "-".join(m.lower() for m in mods)
+        plot_path = os.path.join(out_dir, f"ber_{tag}_{channel}.png")
+        plt.savefig(plot_path, bbox_inches="tight")
+        plt.close(fig)
+
+    if single:
+        points = results[0]
+        kpis = {
+            "snr_db": snr_db_list[:len(points)],
+            "ber": [p["ber"] for p in points],
+            "ber_ci": [p["ci"] for p in points],
+            "bits_simulated": [p["bits"] for p in points],
+            "errors": [p["errors"] for p in points],
+            "snr_db_skipped": snr_db_list[len(points):],
+            "ber_theory": theory[0],
+            "modulation": modulation,
+        }
+    else:
+        # Per-modulation dicts, like simulate_ber_mimo's per-config kpis
+        kpis = {
+            "snr_db": snr_db_list,
+            "ber": {m: [p["ber"] for p in pts] for m, pts in zip(mods, results)},
+            "ber_ci": {m: [p["ci"] for p in pts] for m, pts in zip(mods, results)},
+            "bits_simulated": {m: [p["bits"] for p in pts] for m, pts in zip(mods, results)},
+            "errors": {m: [p["errors"] for p in pts] for m, pts in zip(mods, results)},
+            "ber_theory": dict(zip(mods, theory)),
+            "modulation": mods,
+            "common_random": backend == "numpy",
+        }
+    kpis.update({"channel": channel, "demapper": demapper, "backend": backend,
+                 "importance_sampling": importance_sampling, "batch_size": batch_size})
+    if memory_budget_mb is not None:
+        kpis["memory_budget_mb"] = memory_budget_mb
+    if note is not None:
+        kpis["note"] = note
+    if store is not None:
+        reused = [[p0.n_bits for p0 in start[:len(points)]] for start, points in zip(prior, results)]
+        kpis["bits_reused"] = reused[0] if single else dict(zip(mods, reused))
+    if n_workers is not None:
+        kpis.update({"n_workers": resolve_workers(n_workers), "seed_entropy": root.entropy})
+
+    return {"plots": [plot_path], "kpis": kpis}
+
+
+def _tune_batch_size(ks, fading, demapper, importance_sampling, backend, snr_db_list, rule,
+                     n_workers, memory_budget_mb, warmup, confidence):
+    """Largest batch fitting the memory budget, optionally refined by timing."""
+    if memory_budget_mb == "auto":
+        memory_budget_mb = batch_tuning.default_budget_mb()
+    # Every worker holds its own batch
+    budget = float(memory_budget_mb) / (resolve_workers(n_workers) if n_workers is not None else 1)
+    per_symbol = max(batch_tuning.ber_bytes_per_symbol(k, fading, demapper, importance_sampling,
+                                                       backend) for k in ks)
+    if len(ks) > 1 and backend == "numpy":
+        per_symbol += 8 * max(ks)                        # bits shared across modulations
+    rows = len(snr_db_list) if backend == "sionna" else 1
+    # No point in a batch larger than one SNR point's bit budget
+    cap = -(-rule.budget // min(ks))
+    bs = batch_tuning.pick_batch_size(per_symbol, budget, rows=rows,
+                                      hi=max(batch_tuning.MIN_BATCH, min(batch_tuning.MAX_BATCH, cap)))
+    if warmup and backend == "numpy":
+        one_batch = StoppingRule(n_bits=1)
+        bs = batch_tuning.warmup_refine(
+            lambda b: _run_numpy(ks, fading, b, snr_db_list[:1], one_batch, None, confidence, 0,
+                                 demapper, importance_sampling), bs)
+    return bs
+
+
+def _run_numpy(ks, fading, batch_size, snr_db_list, rule, ber_floor, confidence, seed,
+               demapper, importance_sampling=False, prior=None, points=None):
+    """
+    NumPy backend for one or more modulations (bits per symbol ks).
+
+    All modulations see common random numbers: every batch draws one set of
+    bits [B, max k], fading taps h [B] and unit noise w [B], and modulation i
+    uses bits[:, :k_i] and noise sqrt(no_i) * w. Their BER differences are
+    then much less noisy than with independent runs. Each modulation keeps
+    its own stopping rule and ber_floor.
+
+    prior[i][s] (core.point_store.PointCounts) resumes modulation i at
+    point s from stored counts; the stopping rule applies to the totals.
+    points[s] is the index of snr_db_list[s] in the progress report (default s).
+    Returns point_kpis() lists, one per modulation (with the IS sums s1/s2).
+    """
+    rng = np.random.default_rng(seed)
+    qams = [nphy.SquareQam(k) for k in ks]
+    k_max = max(ks)
+
+    results = [[] for _ in ks]
+    alive = list(range(len(ks)))
+    for s, snr_db in enumerate(snr_db_list):
+        if not alive:
+            break
+        no = [float(nphy.ebnodb2no(snr_db, k, coderate=1.0)) for k in ks]
+        start = [prior[i][s] if prior is not None else None for i in range(len(ks))]
+        n_err = [p.n_err if p else 0 for p in start]
+        n_tot = [p.n_bits if p else 0 for p in start]
+        if importance_sampling:
+            bias = [_is_bias(qam, no_i, fading) for qam, no_i in zip(qams, no)]
+            acc = [WeightedCounts.resume(k, p.n_err, p.n_bits, p.s1, p.s2) if p else WeightedCounts(k)
+                   for k, p in zip(ks, start)]
+            active = [i for i in alive
+                      if not rule.done(acc[i].raw_errors, acc[i].n_bits, acc[i].estimate(confidence))]
+        else:
+            active = [i for i in alive if not rule.done(n_err[i], n_tot[i])]
+        point = s if points is None else points[s]
+        while active:
+            progress.check_cancelled()
+            b = nphy.random_bits(rng, (batch_size, k_max))
+            w = nphy.complex_normal(rng, batch_size)
+            if fading and importance_sampling:
+                # |h|^2 = theta * Exp(1) from shared uniforms, uniform phase
+                e1 = -np.log1p(-rng.random(batch_size))
+                phase = np.exp(2j * np.pi * rng.random(batch_size))
+            elif fading:
+                h = nphy.complex_normal(rng, batch_size)
+            for i in active:
+                k, qam = ks[i], qams[i]
+                x = nphy.qam_map(b[:, :k], qam.points)
+                n = np.sqrt(no[i]) * w
+                if importance_sampling:
+                    c, theta = bias[i]
+                    n = np.sqrt(c) * n
+                    if fading:
+                        g = theta * e1
+                        h = np.sqrt(g) * phase
+                if fading:
+                    y = (h * x + n) / h
+                    no_eff = no[i] / np.abs(h) ** 2
+                else:
+                    y = x + n
+                    no_eff = no[i]
+                errors = (b[:, :k] != (qam.llr(y, no_eff, demapper) > 0))
+                if importance_sampling:
+                    # Likelihood ratio p/q of the biased noise (and fade) draws
+                    lr = c * np.exp(-(c - 1) * np.abs(w) ** 2)
+                    if fading:
+                        lr = lr * theta * np.exp(-g * (1 - 1 / theta))
+                    acc[i].add(lr, errors.sum(axis=1))
+                    progress.report(i, point, acc[i].n_bits, acc[i].raw_errors)
+                    done = rule.done(acc[i].raw_errors, acc[i].n_bits, acc[i].estimate(confidence))
+                else:
+                    n_err[i] += int(np.count_nonzero(errors))
+                    n_tot[i] += batch_size * k
+                    progress.report(i, point, n_tot[i], n_err[i])
+                    done = rule.done(n_err[i], n_tot[i])
+                if done:
+                    active = [j for j in active if j != i]
+
+        for i in list(alive):
+            if importance_sampling:
+                results[i].append({**acc[i].kpis(confidence), "s1": acc[i].s1, "s2": acc[i].s2})
+            else:
+                results[i].append(point_kpis(n_err[i], n_tot[i], confidence))
+            if ber_floor is not None and results[i][-1]["ber"] < ber_floor:
+                alive.remove(i)
+    return results
+
+
+def _truncate(points, ber_floor):
+    """Cut a finished sweep after the first point below ber_floor."""
+    for i, p in enumerate(points):
+        if ber_floor is not None and p["ber"] < ber_floor:
+            return points[:i + 1]
+    return points
+
+
+def _is_bias(qam, no, fading):
+    """
+    Importance-sampling bias for one point: (noise variance factor c, mean
+    fade power theta). AWGN errors need noise ~ half the minimum distance,
+    so c = d_min^2 / (2 no). With fading, errors come from deep fades, so
+    |h|^2 is drawn from Exp(theta) with theta ~ the fade that brings the
+    per-axis SNR down to ~1, and the noise is left unbiased.
+    """
+    d2 = (2.0 / qam.scale) ** 2
+    if fading:
+        return 1.0, min(1.0, IS_FADE_FACTOR * 2 * no / d2)
+    return max(1.0, d2 / (2 * no)), 1.0
+
+
+def _run_sionna(k, fading, batch_size, snr_db_list, rule, ber_floor, confidence,
+                compiled, xla, demapper):
+    """
+    Sionna backend (compiled sweep or eager per-batch loop).
+    Returns point_kpis() per SNR point, or an error string.
+    """
     try:
         import tensorflow as tf
         # Only need Mapper/Demapper/AWGN/FlatFading/ebnodb2no
         _, Mapper, Demapper, AWGN, FlatFadingChannel, ebnodb2no = phy_imports()
     except Exception as e:
-        return {"plots": [], "kpis": {}, "error": f"Sionna/TensorFlow import failed: {e}"}
-
-    mod = modulation.lower()
-
-    # bits per symbol k
-    if mod == "qpsk":
-        k = 2
-    elif "qam" in mod:
-        M = int(mod.replace("qam", ""))
-        k = int(np.log2(M))
-    else:
-        return {"plots": [], "kpis": {}, "error": f"Unknown modulation: {modulation}"}
+        return f"Sionna/TensorFlow import failed: {e}"
 
-    mapper = Mapper(constellation_type="qam", num_bits_per_symbol=k)
-    demapper = Demapper("app", constellation_type="qam", num_bits_per_symbol=k)
+    # Layers (and the compiled sweep) are reused across calls in this process
+    method = demapper
+    mapper = layer_cache.get(("mapper", k),
+                             lambda: Mapper(constellation_type="qam", num_bits_per_symbol=k))
+    demapper = layer_cache.get(("demapper", method, k),
+                               lambda: Demapper(method, constellation_type="qam",
+                                                num_bits_per_symbol=k))
 
-    fading = (channel.lower() == "rayleigh")
     if fading:
-        ch = FlatFadingChannel(num_tx_ant=1, num_rx_ant=1, add_awgn=True)
+        ch = layer_cache.get(("flat_fading", 1, 1),
+                             lambda: FlatFadingChannel(num_tx_ant=1, num_rx_ant=1, add_awgn=True,
+                                                       return_channel=True))
     else:
-        ch = AWGN()
+        ch = layer_cache.get(("awgn",), AWGN)
+
+    if compiled is None:
+        compiled = sionna_phy_version() >= 1
 
-    bers = []
+    points = []
+    if compiled:
+        count_errors = layer_cache.get(
+            ("ber_graph", k, fading, method, batch_size, xla),
+            lambda: _ber_graph(tf, mapper, demapper, ch, fading, k, batch_size, xla))
+        counts = _run_compiled(tf, count_errors, k, batch_size,
+                               [ebnodb2no(snr_db, k, coderate=1.0) for snr_db in snr_db_list],
+                               rule)
+        for n_err, n_tot in counts:
+            points.append(point_kpis(n_err, n_tot, confidence))
+            if ber_floor is not None and points[-1]["ber"] < ber_floor:
+                break
+        return points
 
     for snr_db in snr_db_list:
         no = ebnodb2no(snr_db, k, coderate=1.0)
 
-        n_err = 0
-        n_tot = 0
-
-        while n_tot < n_bits:
+        def batch():
             b = tf.random.uniform([batch_size, k], 0, 2, dtype=tf.int32)
             x = mapper(b)
+            llr = _channel_and_demap(ch, demapper, x, no, fading)
+            b_hat = tf.cast(llr > 0, tf.int32)
+            n_err = tf.reduce_sum(tf.cast(tf.not_equal(b, b_hat), tf.int32)).numpy()
+            return n_err, batch_size * k
 
+        n_err, n_tot = run_until(batch, rule)
+        points.append(point_kpis(n_err, n_tot, confidence))
+
+        if ber_floor is not None and points[-1]["ber"] < ber_floor:
+            break
+    return points
+
+
+def _call(layer, *args):
+    """Sionna 1.x layers take positional args, 0.x Keras layers one list."""
+    try:
+        return layer(*args)
+    except TypeError:
+        return layer(list(args))
+
+
+def _channel_and_demap(ch, demapper, x, no, fading):
+    """x: [..., 1] symbols -> LLRs [..., k]. Fading is equalized (y/h) first."""
+    if not fading:
+        y = _call(ch, x, no)
+        return _call(demapper, y, no)
+
+    import tensorflow as tf
+    y, h = _call(ch, x, no)                      # y: [N, 1], h: [N, 1, 1]
+    h = tf.reshape(h, tf.shape(y))
+    y_eq = y / h
+    no_eff = tf.cast(no, y.dtype.real_dtype) / tf.abs(h) ** 2
+    return _call(demapper, y_eq, no_eff)
+
+
+def _ber_graph(tf, mapper, demapper, ch, fading, k, batch_size, xla):
+    """
+    Whole-sweep graph: SNR points are the leading batch dimension.
+    count_errors(no [S], n_iter) -> error counts [S].
+    """
+    @tf.function(jit_compile=xla, input_signature=[
+        tf.TensorSpec([None], tf.float32), tf.TensorSpec([], tf.int32)])
+    def count_errors(no, n_iter):
+        n_snr = tf.shape(no)[0]
+
+        def body(i, err):
+            b = tf.random.uniform([n_snr, batch_size, k], 0, 2, dtype=tf.int32)
+            x = mapper(b)                                           # [S, B, 1]
             if fading:
-                # Sionna 1.x style
-                try:
-                    y, h = ch(x, no)
-                except TypeError:
-                    # old fallback
-                    y, h = ch([x, no])
-                llr = demapper(y, h, no) if hasattr(demapper, "__call__") else demapper([y, h, no])
+                # FlatFadingChannel wants [N, num_tx_ant]; fold S into N
+                no_n = tf.repeat(no, batch_size)[:, None]           # [S*B, 1]
+                llr = _channel_and_demap(ch, demapper,
+                                         tf.reshape(x, [-1, 1]), no_n, fading)
             else:
-                try:
-                    y = ch(x, no)
-                except TypeError:
-                    y = ch([x, no])
-                llr = demapper(y, no) if hasattr(demapper, "__call__") else demapper([y, no])
+                llr = _channel_and_demap(ch, demapper, x, no[:, None, None], fading)
+            b_hat = tf.reshape(tf.cast(llr > 0, tf.int32), [n_snr, batch_size, k])
+            err += tf.reduce_sum(tf.cast(tf.not_equal(b, b_hat), tf.int64), axis=[1, 2])
+            return i + 1, err
 
-            b_hat = tf.cast(llr > 0, tf.int32)
-            n_err += tf.reduce_sum(tf.cast(tf.not_equal(b, b_hat), tf.int32)).numpy()
-            n_tot += batch_size * k
+        _, err = tf.while_loop(lambda i, _: i < n_iter, body,
+                               [tf.constant(0), tf.zeros([n_snr], tf.int64)])
+        return err
 
-        bers.append(n_err / n_tot)
+    return count_errors
 
-    # Plot
-    fig = plt.figure()
-    plt.semilogy(snr_db_list, bers, marker="o")
-    plt.title(f"BER vs SNR ({modulation.upper()} - {channel.upper()})")
-    plt.xlabel("SNR (dB)")
-    plt.ylabel("BER")
-    plt.grid(True, which="both")
-
-    plot_path = os.path.join(out_dir, f"ber_{mod}_{channel}.png")
-    plt.savefig(plot_path, bbox_inches="tight")
-    plt.close(fig)
-
-    return {
-        "plots": [plot_path],
-        "kpis": {
-            "snr_db": snr_db_list,
-            "ber": bers,
-            "modulation": modulation,
-            "channel": channel
-        }
-    }
+
+def _run_compiled(tf, count_errors, k, batch_size, no_list, rule):
+    """Runs the _ber_graph sweep. Returns [(n_err, n_bits)] per SNR point."""
+    bits_per_iter = batch_size * k
+    no_all = np.array([float(no) for no in no_list], dtype=np.float32)
+    n_err = np.zeros(len(no_list), dtype=np.int64)
+    n_tot = np.zeros(len(no_list), dtype=np.int64)
+
+    if not rule.adaptive:
+        # Fixed budget: a single graph call and a single host sync
+        n_iter = -(-rule.n_bits // bits_per_iter)
+        if n_iter > 0:
+            n_err += count_errors(tf.constant(no_all), tf.constant(n_iter)).numpy()
+            n_tot += n_iter * bits_per_iter
+        return list(zip(n_err.tolist(), n_tot.tolist()))
+
+    # Adaptive: rounds over the still-active points, one sync per round.
+    # The first round is one batch (the rule is checked as early as on the
+    # NumPy path); rounds then double, so a long point needs O(log) syncs.
+    chunk = 1
+    active = [i for i in range(len(no_list)) if not rule.done(0, 0)]
+    while active:
+        progress.check_cancelled()
+        remaining = min(-(-(rule.budget - int(n_tot[i])) // bits_per_iter) for i in active)
+        n_iter = max(1, min(chunk, remaining))
+        err = count_errors(tf.constant(no_all[active]), tf.constant(n_iter)).numpy()
+        n_err[active] += err
+        n_tot[active] += n_iter * bits_per_iter
+        active = [i for i in active if not rule.done(int(n_err[i]), int(n_tot[i]))]
+        chunk *= 2
+        # Don't overshoot: batches the closest point still short of
+        # target_errors needs at its current BER (points past it that only
+        # wait on ci_rel_width / min_bits keep the doubling)
+        short = [i for i in active if rule.target_errors is not None
+                 and int(n_err[i]) < rule.target_errors]
+        if short:
+            need = min(-(-(rule.target_errors - int(n_err[i])) * int(n_tot[i])
+                         // (max(int(n_err[i]), 1) * bits_per_iter)) for i in short)
+            chunk = max(1, min(chunk, need))
+    return list(zip(n_err.tolist(), n_tot.tolist()))
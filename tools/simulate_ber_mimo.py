@@ -1,42 +1,14 @@
 import os
 import numpy as np
 import matplotlib.pyplot as plt
-from core.sionna_compat import phy_imports
-
-
-def _qam_constellation(M: int):
-    """
-    Square M-QAM constellation (unit average power).
-    Returns: complex numpy array of shape [M].
-    """
-    m_side = int(np.sqrt(M))
-    assert m_side * m_side == M, "M must be a square number (e.g., 4,16,64,256)."
-
-    re = np.arange(-(m_side - 1), m_side + 1, 2)
-    im = np.arange(-(m_side - 1), m_side + 1, 2)
-    grid = re[None, :] + 1j * im[:, None]
-    pts = grid.flatten()
-
-    # Normalize to unit average power
-    pts = pts / np.sqrt(np.mean(np.abs(pts) ** 2))
-    return pts
-
-
-def _bits_to_int(bits):
-    """bits: [..., k] -> integer indices [...]"""
-    out = np.zeros(bits.shape[:-1], dtype=np.int32)
-    for i in range(bits.shape[-1]):
-        out = (out << 1) | bits[..., i]
-    return out
-
-
-def _int_to_bits(idx, k):
-    """idx: [...] -> bits [..., k]"""
-    bits = np.zeros((*idx.shape, k), dtype=np.int32)
-    for i in range(k - 1, -1, -1):
-        bits[..., i] = idx & 1
-        idx = idx >> 1
-    return bits
+from core.plotting import plot_lock
+from core.sionna_compat import phy_imports, select_backend
+from core import numpy_phy as nphy
+from core.ber_stats import StoppingRule, run_until, point_kpis
+from core.parallel import run_tasks, spawn_seeds, resolve_workers
+from core import batch_tuning, progress
+from core.layer_cache import layer_cache
+from core.point_store import PointCounts, open_store
 
 
 def simulate_ber_mimo(
@@ -45,16 +17,34 @@ def simulate_ber_mimo(
     configs=None,                   # e.g. [{"nt":1,"nr":1},{"nt":4,"nr":4}]
     n_bits: int = 30000,            # CPU-safe default
     batch_size: int = 200,          # CPU-safe default
+    target_errors=None,             # adaptive stop: errors per point
+    ci_rel_width=None,              # adaptive stop: (CI width / BER) per point
+    min_bits=None,
+    max_bits=None,                  # adaptive budget per point (default n_bits)
+    ber_floor=None,                 # stop a config's sweep once BER < floor
+    confidence: float = 0.95,
+    demapper: str = "hard",         # "hard", "maxlog" or "app"
+    detector: str = "mrc",          # "mrc" (repetition), or spatial multiplexing: "zf", "mmse", "kbest"
+    kbest_k: int = 8,               # survivors per layer for detector="kbest"
+    common_random: bool = False,    # NumPy backend: same bits/channel/noise for every config
+    n_workers=None,                 # NumPy backend: parallel configs x SNR points (-1 = all cores)
+    memory_budget_mb=None,          # auto-tune batch_size to this budget (MB, or "auto")
+    autotune_warmup: bool = False,  # refine the tuned batch with a short timed warm-up (NumPy)
+    point_store=None,               # NumPy backend: reuse per-point counts (True or sqlite path)
+    backend: str = "auto",          # "auto", "numpy" or "sionna"
+    seed=None,                      # NumPy backend RNG seed
     out_dir: str = "outputs"
 ):
     """
-    CPU-friendly MIMO BER baseline:
-    - Uses Sionna Mapper + FlatFadingChannel
-    - Repetition across TX antennas
-    - MRC combining
-    - Nearest-neighbor hard demapping in NumPy
-
-    This avoids APP-demapper OOM on CPU.
+    CPU-friendly MIMO BER baseline, one curve per nt x nr config:
+    - Repetition TX + MRC (detector="mrc"), or spatial multiplexing with
+      ZF / MMSE / K-best detection (a config may set its own "detector")
+    - Hard, max-log or APP per-axis demapping (K-best decides hard)
+    - Sionna Mapper + FlatFadingChannel, or the same chain in pure NumPy
+
+    Stopping rule, n_workers, memory_budget_mb, point_store and progress
+    work as in simulate_ber; common_random shares the draws across configs.
+    See "BER simulation options" in README.md.
     """
 
     os.makedirs(out_dir, exist_ok=True)
@@ -64,20 +54,9 @@ def simulate_ber_mimo(
     if configs is None:
         configs = [{"nt": 1, "nr": 1}, {"nt": 4, "nr": 4}]
 
-    try:
-        import tensorflow as tf
-        _, Mapper, _, _, FlatFadingChannel, ebnodb2no = phy_imports()
-    except Exception as e:
-        return {
-            "plots": [],
-            "kpis": {},
-            "error": f"Sionna/TensorFlow import failed: {e}"
-        }
-
     mod = modulation.lower()
     if "qam" in mod:
-        M = int(mod.replace("qam", ""))
-        k = int(np.log2(M))
+        k = nphy.bits_per_symbol(mod)
     else:
         return {
             "plots": [],
@@ -85,105 +64,162 @@ def simulate_ber_mimo(
             "error": f"Unknown modulation: {modulation}"
         }
 
-    mapper = Mapper(constellation_type="qam", num_bits_per_symbol=k)
-    const_pts = _qam_constellation(M)
+    demapper = demapper.lower()
+    if demapper not in ("hard", "maxlog", "app"):
+        return {"plots": [], "kpis": {}, "error": f"Unknown demapper: {demapper}"}
+    detector = detector.lower()
+    for cfg in configs:
+        det_c = cfg.get("detector", detector).lower()
+        if det_c not in ("mrc", "zf", "mmse", "kbest"):
+            return {"plots": [], "kpis": {}, "error": f"Unknown detector: {det_c}"}
+        if det_c != "mrc" and cfg["nr"] < cfg["nt"]:
+            return {"plots": [], "kpis": {}, "error": f"Spatial multiplexing needs nr >= nt: {cfg}"}
 
+    try:
+        backend = select_backend(backend)
+    except ValueError as e:
+        return {"plots": [], "kpis": {}, "error": str(e)}
+
+    if backend == "sionna":
+        try:
+            import tensorflow as tf
+            _, Mapper, _, _, FlatFadingChannel, ebnodb2no = phy_imports()
+        except Exception as e:
+            return {
+                "plots": [],
+                "kpis": {},
+                "error": f"Sionna/TensorFlow import failed: {e}"
+            }
+        mapper = layer_cache.get(("mapper", k),
+                                 lambda: Mapper(constellation_type="qam", num_bits_per_symbol=k))
+    else:
+        ebnodb2no = nphy.ebnodb2no
+        rng = np.random.default_rng(seed)
+
+    # Sionna's QAM labeling, so hard decisions map back to the sent bits
+    qam = nphy.SquareQam(k)
+
+    rule = StoppingRule(n_bits=n_bits, target_errors=target_errors,
+                        ci_rel_width=ci_rel_width, min_bits=min_bits,
+                        max_bits=max_bits, confidence=confidence)
     all_bers = {}
+    all_points = {}
+    bits_per_use = {}
 
+    labels, legend, shapes = [], [], []
     for cfg in configs:
         nt, nr = cfg["nt"], cfg["nr"]
-        label = f"{nt}x{nr}"
-
-        ch = FlatFadingChannel(num_tx_ant=nt, num_rx_ant=nr, add_awgn=True)
-
-        bers = []
-        for snr_db in snr_db_list:
-            no = ebnodb2no(snr_db, k, coderate=1.0)
-
-            n_err = 0
-            n_tot = 0
-            target_bits = n_bits
-
-            while n_tot < target_bits:
-                # ---- Bits -> Symbols ----
-                b = tf.random.uniform([batch_size, k], 0, 2, dtype=tf.int32)
-                x = mapper(b)  # typically [B, 1] complex
-
-                # Repeat same symbol across nt TX antennas
-                x_mimo = tf.tile(tf.expand_dims(x, axis=2), [1, 1, nt])  # [B,1,nt] or similar
-
-                # ---- Channel ----
-                try:
-                    out = ch(x_mimo, no)       # Sionna 1.x style
-                except TypeError:
-                    out = ch([x_mimo, no])    # old fallback
-
-                if isinstance(out, tuple):
-                    y = out[0]
-                    h = out[1] if len(out) > 1 else None
-                else:
-                    y = out
-                    h = None
-
-                # ---- Convert to numpy ----
-                y_np = y.numpy()
-                if h is not None:
-                    h_np = h.numpy()
-                else:
-                    h_np = np.ones((batch_size, nr, nt), dtype=np.complex64)
-
-                # ---- Make shapes robust ----
-                # y_np could be [B, nr] or [B, 1, nr]
-                if y_np.ndim == 3:
-                    y_np = y_np[:, 0, :]   # -> [B, nr]
-                elif y_np.ndim == 2:
-                    pass                   # already [B, nr]
-                else:
-                    raise ValueError(f"Unexpected y shape: {y_np.shape}")
-
-                # h_np could be [B, nr, nt] or [B, 1, nr, nt]
-                if h_np.ndim == 4:
-                    h_np = h_np[:, 0, :, :]  # -> [B, nr, nt]
-                elif h_np.ndim == 3:
-                    pass
-                else:
-                    raise ValueError(f"Unexpected h shape: {h_np.shape}")
-
-                # ---- MRC combining for repetition baseline ----
-                # num = sum_{r,t} conj(h[r,t]) * y[r]
-                num = np.sum(np.conj(h_np) * y_np[:, :, None], axis=(1, 2))  # [B]
-                den = np.sum(np.abs(h_np) ** 2, axis=(1, 2)) + 1e-9          # [B]
-                s_hat = num / den                                           # [B]
-
-                # ---- Hard nearest-neighbor demap ----
-                d2 = np.abs(s_hat[:, None] - const_pts[None, :]) ** 2        # [B, M]
-                sym_idx_hat = np.argmin(d2, axis=1)                          # [B]
-                b_hat = _int_to_bits(sym_idx_hat, k)                         # [B, k]
-
-                b_np = b.numpy().reshape(batch_size, k)                      # [B, k]
-
-                # ---- Count errors ----
-                n_err += np.sum(b_hat != b_np)
-                n_tot += batch_size * k
-
-            bers.append(n_err / n_tot)
-
-        all_bers[label] = bers
+        det_c = cfg.get("detector", detector).lower()
+        demap_c = "hard" if det_c == "kbest" else demapper   # K-best decides hard
+        ns = 1 if det_c == "mrc" else nt          # streams per channel use
+        labels.append(f"{nt}x{nr}" + (f" {det_c}" if "detector" in cfg else ""))
+        legend.append(f"{nt}x{nr} {det_c.upper()}, {demap_c} demap")
+        shapes.append((nt, nr, ns, dict(detector=det_c, demapper=demap_c, kbest_k=kbest_k)))
+        bits_per_use[labels[-1]] = ns * k
+
+    if n_workers is not None and backend != "numpy":
+        return {"plots": [], "kpis": {}, "error": "n_workers needs the NumPy backend"}
+
+    # Config indices per sweep group: one common-random group, or one per config
+    members = [list(range(len(shapes)))] if common_random and backend == "numpy" \
+        else [[c] for c in range(len(shapes))]
+    groups = [[shapes[c] for c in m] for m in members]
+    if backend == "numpy":
+        no_list = [float(ebnodb2no(snr_db, k, coderate=1.0)) for snr_db in snr_db_list]
+    if memory_budget_mb is not None:
+        batch_size = _tune_batch_size(qam, groups, backend, n_workers, rule,
+                                      no_list if backend == "numpy" else snr_db_list,
+                                      memory_budget_mb, autotune_warmup)
+
+    # Stored per-point counts: the run starts from them with fresh draws
+    store = open_store(point_store) if backend == "numpy" else None
+    prior, run_seed = [None] * len(shapes), seed
+    if store is not None:
+        scenarios = [store.scenario("simulate_ber_mimo", k=k, nt=nt, nr=nr, seed=seed,
+                                    **{key: v for key, v in det.items()
+                                       if key != "kbest_k" or det["detector"] == "kbest"})
+                     for nt, nr, ns, det in shapes]
+        prior = [[st[snr_db] for snr_db in snr_db_list]
+                 for st in (store.load(sc, snr_db_list) for sc in scenarios)]
+        run_seed = store.seed_sequence(seed, scenarios)
+        rng = np.random.default_rng(run_seed)
+
+    progress.begin(snr_db_list, series=labels)
+    if backend == "numpy":
+        all_counts = []
+        if n_workers is not None:
+            # One task per (config group, SNR point), each with its own SeedSequence child
+            root, seeds = spawn_seeds(run_seed, len(groups) * len(no_list))
+            tasks = [(k, group, no, batch_size, rule, seeds[g * len(no_list) + j],
+                      _prior_rows(prior, members[g], [j]), members[g], [j])
+                     for g, group in enumerate(groups) for j, no in enumerate(no_list)]
+
+            floor_at = {}                   # config -> first SNR index below ber_floor
+
+            def task_done(t, counts):
+                g, j = divmod(t, len(no_list))
+                for c, ((n_err, n_tot),) in zip(members[g], counts):
+                    progress.report(c, j, n_tot, n_err)
+                    if ber_floor is not None and n_tot and n_err / n_tot < ber_floor:
+                        floor_at[c] = min(j, floor_at.get(c, j))
+                progress.check_cancelled()
+                # Higher-SNR points of a group are not needed once every config hit the floor
+                if all(c in floor_at for c in members[g]):
+                    cut = max(floor_at[c] for c in members[g])
+                    return [g * len(no_list) + i for i in range(cut + 1, len(no_list))]
+
+            per_task = run_tasks(_numpy_task, tasks, n_workers, on_done=task_done)
+            for g, group in enumerate(groups):
+                done = per_task[g * len(no_list):(g + 1) * len(no_list)]
+                all_counts += [[pt[c][0] if pt is not None else (0, 0) for pt in done]
+                               for c in range(len(group))]
+        else:
+            # All SNR points in one batched pipeline: [S, B, ...]
+            for g, group in enumerate(groups):
+                all_counts += _numpy_sweep(rng, qam, group, no_list, batch_size, rule,
+                                           _prior_rows(prior, members[g], range(len(no_list))),
+                                           series=members[g], ber_floor=ber_floor)
+        if store is not None:
+            for sc, counts, start in zip(scenarios, all_counts, prior):
+                store.add(sc, {snr_db: PointCounts(e, b).minus(p0)
+                               for snr_db, (e, b), p0 in zip(snr_db_list, counts, start)})
+    else:
+        all_counts = []
+        for c, (nt, nr, ns, det) in enumerate(shapes):
+            ch = layer_cache.get(("flat_fading", nt, nr),
+                                 lambda: FlatFadingChannel(num_tx_ant=nt, num_rx_ant=nr,
+                                                           add_awgn=True, return_channel=True))
+            all_counts.append(_sionna_sweep(tf, mapper, ch, qam, nt, nr, ns, ebnodb2no,
+                                            snr_db_list, batch_size, rule, det, ber_floor))
+            for j, (n_err, n_tot) in enumerate(all_counts[-1]):
+                progress.report(c, j, n_tot, n_err)
+
+    for label, counts in zip(labels, all_counts):
+        points = []
+        for n_err, n_tot in counts:
+            points.append(point_kpis(n_err, n_tot, confidence))
+            if ber_floor is not None and points[-1]["ber"] < ber_floor:
+                break
+
+        all_points[label] = points
+        all_bers[label] = [p["ber"] for p in points]
 
     # ---- Plot ----
-    fig = plt.figure()
-    for label, bers in all_bers.items():
-        plt.semilogy(snr_db_list, bers, marker="o", label=label)
-
-    plt.title(f"MIMO BER (Hard Demap + MRC, CPU-safe) – {modulation.upper()}")
-    plt.xlabel("SNR (dB)")
-    plt.ylabel("BER")
-    plt.grid(True, which="both")
-    plt.legend()
-
-    plot_path = os.path.join(out_dir, f"ber_mimo_{mod}.png")
-    plt.savefig(plot_path, bbox_inches="tight")
-    plt.close(fig)
+    with plot_lock:
+        fig = plt.figure()
+        for label, name in zip(labels, legend):
+            bers = all_bers[label]
+            plt.semilogy(snr_db_list[:len(bers)], bers, marker="o", label=name)
+
+        plt.title(f"MIMO BER (CPU-safe) – {modulation.upper()}")
+        plt.xlabel("SNR (dB)")
+        plt.ylabel("BER")
+        plt.grid(True, which="both")
+        plt.legend()
+
+        plot_path = os.path.join(out_dir, f"ber_mimo_{mod}.png")
+        plt.savefig(plot_path, bbox_inches="tight")
+        plt.close(fig)
 
     return {
         "plots": [plot_path],
@@ -191,7 +227,318 @@ def simulate_ber_mimo(
             "configs": configs,
             "snr_db": snr_db_list,
             "ber": all_bers,
+            "ber_ci": {lb: [p["ci"] for p in pts] for lb, pts in all_points.items()},
+            "bits_simulated": {lb: [p["bits"] for p in pts] for lb, pts in all_points.items()},
+            "errors": {lb: [p["errors"] for p in pts] for lb, pts in all_points.items()},
             "modulation": modulation,
-            "note": "CPU-friendly baseline: repetition TX + MRC + hard demap."
+            "demapper": demapper,
+            "detector": detector,
+            "common_random": bool(common_random and backend == "numpy"),
+            **({"n_workers": resolve_workers(n_workers), "seed_entropy": root.entropy}
+               if n_workers is not None else {}),
+            "bits_per_use": bits_per_use,
+            "throughput": {lb: [bits_per_use[lb] * (1 - b) for b in bers] for lb, bers in all_bers.items()},
+            "backend": backend,
+            "batch_size": batch_size,
+            **({"bits_reused": {lb: [p0.n_bits for p0 in start[:len(all_bers[lb])]]
+                                for lb, start in zip(labels, prior)}}
+               if store is not None else {}),
+            **({"memory_budget_mb": memory_budget_mb} if memory_budget_mb is not None else {}),
+            "note": (f"CPU-friendly baseline: repetition TX + MRC + {demapper} demap."
+                     if detector == "mrc" else
+                     f"Spatial multiplexing + {detector.upper()} detection + "
+                     f"{'hard' if detector == 'kbest' else demapper} demap.")
+                    + (f" K-best decides hard; demapper='{demapper}' applies to the other configs only."
+                       if demapper != "hard" and any(det["detector"] == "kbest" for *_, det in shapes)
+                       else "")
         }
     }
+
+
+def _tune_batch_size(qam, groups, backend, n_workers, rule, points, memory_budget_mb, warmup):
+    """Largest batch fitting the memory budget, optionally refined by timing."""
+    if memory_budget_mb == "auto":
+        memory_budget_mb = batch_tuning.default_budget_mb()
+    budget = float(memory_budget_mb)
+    if n_workers is not None:
+        budget /= resolve_workers(n_workers)        # every worker holds its own batch
+    # The fused NumPy sweep holds every SNR point; tasks and Sionna run one at a time
+    rows = len(points) if backend == "numpy" and n_workers is None else 1
+
+    def footprint(group):
+        return sum(batch_tuning.mimo_bytes_per_vector(qam.k, nt, nr, det["detector"],
+                                                      det["kbest_k"], backend)
+                   for nt, nr, ns, det in group)
+
+    heaviest = max(groups, key=footprint)
+    # No point in a batch larger than one SNR point's bit budget
+    cap = -(-rule.budget // min(ns * qam.k for g in groups for _, _, ns, _ in g))
+    bs = batch_tuning.pick_batch_size(footprint(heaviest), budget, rows=rows,
+                                      hi=max(batch_tuning.MIN_BATCH, min(batch_tuning.MAX_BATCH, cap)))
+    if warmup and backend == "numpy":
+        one_batch = StoppingRule(n_bits=1)
+        bs = batch_tuning.warmup_refine(
+            lambda b: _numpy_sweep(np.random.default_rng(0), qam, heaviest, points[:rows], b,
+                                   one_batch), bs)
+    return bs
+
+
+def _buffers(qam, lead, nr, ns):
+    """
+    Preallocated work arrays; lead = (S, B), ns = streams (1 for repetition,
+    nt for spatial multiplexing). Shapes in the comments.
+    """
+    lead = tuple(lead)
+    return {
+        "bits": np.empty(lead + (ns, qam.k), dtype=np.int8),      # [S, B, ns, k]
+        "x": np.empty(lead + (ns,), dtype=np.complex64),          # [S, B, ns]
+        "y": np.empty(lead + (nr,), dtype=np.complex64),          # [S, B, nr]
+        "g": np.empty(lead + (nr,), dtype=np.complex64),          # [S, B, nr]
+        "g2": np.empty(lead + (nr,), dtype=np.float32),           # [S, B, nr]
+        "den": np.empty(lead + (1,), dtype=np.float32),           # [S, B, 1]
+        "s_hat": np.empty(lead + (ns,), dtype=np.complex64),      # [S, B, ns]
+        "err": np.empty(lead + (ns, qam.k), dtype=bool),          # [S, B, ns, k]
+        "demap": qam.buffers(lead + (ns,)),
+    }
+
+
+def _head(buf, n):
+    """Views of the first n SNR rows of [S, B, ...] buffers (still contiguous)."""
+    return {key: (_head(v, n) if isinstance(v, dict) else v[:n]) for key, v in buf.items()}
+
+
+def _detect_errors(qam, y, h, no, buf, det):
+    """
+    Detection + demapping + bit errors per SNR row.
+    y [S, B, nr], h [S, B, nr, nt], no [S, 1, 1] -> errors [S]
+    """
+    if det["detector"] == "kbest":
+        idx = _kbest(y, h, qam.points, det["kbest_k"])                     # [S, B, nt]
+        b_hat = np.take(qam.bits, idx, axis=0, out=buf["demap"]["bits"])    # [S, B, nt, k]
+    else:
+        if det["detector"] == "mrc":
+            s_hat, no_eff = _mrc(y, h, no, buf)
+        else:
+            s_hat, no_eff = _linear(y, h, no, det["detector"])
+        if det["demapper"] == "hard":
+            b_hat = qam.hard_bits(s_hat, buf["demap"])                      # [S, B, ns, k]
+        else:
+            b_hat = qam.llr(s_hat, no_eff, det["demapper"]) > 0             # [S, B, ns, k]
+    np.not_equal(b_hat, buf["bits"], out=buf["err"])
+    return np.count_nonzero(buf["err"].reshape(buf["err"].shape[0], -1), axis=1)
+
+
+def _prior_rows(prior, configs, points):
+    """[C, S, 2] (n_err, n_bits) start counts for _numpy_sweep, or None."""
+    if prior[configs[0]] is None:
+        return None
+    return np.array([[(prior[c][j].n_err, prior[c][j].n_bits) for j in points] for c in configs],
+                    dtype=np.int64)
+
+
+def _numpy_sweep(rng, qam, shapes, no_list, batch_size, rule, prior=None, series=None,
+                 points=None, ber_floor=None):
+    """
+    Fused NumPy pipeline, all SNR points at once, for one or more configs
+    shapes = [(nt, nr, ns, det)] that share every random draw.
+
+    Each round draws one batch for every SNR point still active in any
+    config (S of them), at the largest sizes NT, NR, NS:
+      idx    [S, B, NS]     uniform symbol indices (same as uniform bits)
+      h      [S, B, NR, NT] i.i.d. CN(0, 1) flat Rayleigh taps
+      n      [S, B, NR]     CN(0, no[s]) noise
+    and each config uses its leading block (idx[..., :ns], h[..., :nr, :nt],
+    n[..., :nr]) on its own active points:
+      bits   [S, B, ns, k]  int8, from the index -> bits table
+      x      [S, B, ns]     complex64 QAM symbols
+      y      [S, B, nr]     repetition (ns = 1): (sum_t h) * x + n
+                            spatial multiplexing (ns = nt): h @ x + n
+      s_hat  [S, B, ns]     detector output, then per-axis demap -> [S, B, ns, k]
+    prior [C, S, 2] resumes every (config, point) from stored (n_err, n_bits);
+    the stopping rule applies to the totals. series[c] / points[s] are the
+    config and SNR-point indices reported to core.progress (default c, s).
+    Once a config has a finished point below ber_floor, its later (higher
+    SNR) points are dropped from the rounds.
+    Returns one [(n_err, n_bits)] list (per SNR point) per config.
+    """
+    n_snr = len(no_list)
+    NT, NR, NS = (max(shp[i] for shp in shapes) for i in range(3))
+    no_all = np.asarray(no_list, dtype=np.float32)
+    h_full = np.empty((n_snr, batch_size, NR, NT), dtype=np.complex64)
+    n_full = np.empty((n_snr, batch_size, NR), dtype=np.complex64)
+    bufs = [_buffers(qam, (n_snr, batch_size), nr, ns) for _, nr, ns, _ in shapes]
+
+    n_err = np.zeros((len(shapes), n_snr), dtype=np.int64)
+    n_tot = np.zeros((len(shapes), n_snr), dtype=np.int64)
+    if prior is not None:
+        n_err[:], n_tot[:] = prior[..., 0], prior[..., 1]
+    active = [[i for i in range(n_snr) if not rule.done(int(n_err[c, i]), int(n_tot[c, i]))]
+              for c in range(len(shapes))]
+    series = range(len(shapes)) if series is None else series
+    points = range(n_snr) if points is None else points
+    if ber_floor is not None:
+        active = [_floor_cut(a, e, t, ber_floor) for a, e, t in zip(active, n_err, n_tot)]
+
+    while any(active):
+        progress.check_cancelled()
+        rows = sorted(set().union(*active))
+        no = no_all[rows][:, None, None]                            # [S, 1, 1]
+        idx = rng.integers(0, 2 ** qam.k, size=(len(rows), batch_size, NS))
+        h = nphy.fill_complex_normal(rng, h_full[:len(rows)])
+        noise = nphy.fill_complex_normal(rng, n_full[:len(rows)], no)
+
+        for c, (nt, nr, ns, det) in enumerate(shapes):
+            if not active[c]:
+                continue
+            # This config's rows among the drawn ones (a view when it uses them all)
+            sel = slice(None) if len(active[c]) == len(rows) else [rows.index(i) for i in active[c]]
+            buf = _head(bufs[c], len(active[c]))
+            hc = h[sel][..., :nr, :nt]
+            np.take(qam.bits, idx[sel][..., :ns], axis=0, out=buf["bits"])
+            np.take(qam.points, idx[sel][..., :ns], out=buf["x"])
+            if ns == 1:
+                np.sum(hc, axis=-1, out=buf["g"])
+                np.multiply(buf["g"], buf["x"], out=buf["y"])
+            else:
+                np.einsum("...rt,...t->...r", hc, buf["x"], out=buf["y"])
+            buf["y"] += noise[sel][..., :nr]
+
+            n_err[c, active[c]] += _detect_errors(qam, buf["y"], hc, no[sel], buf, det)
+            n_tot[c, active[c]] += batch_size * ns * qam.k
+            for i in active[c]:
+                progress.report(series[c], points[i], n_tot[c, i], n_err[c, i])
+            active[c] = [i for i in active[c] if not rule.done(int(n_err[c, i]), int(n_tot[c, i]))]
+            if ber_floor is not None:
+                active[c] = _floor_cut(active[c], n_err[c], n_tot[c], ber_floor)
+
+    return [list(zip(e.tolist(), t.tolist())) for e, t in zip(n_err, n_tot)]
+
+
+def _floor_cut(active, n_err, n_tot, ber_floor):
+    """Active points before the first finished point with BER < ber_floor."""
+    below = [i for i in range(len(n_tot)) if i not in active and n_tot[i]
+             and n_err[i] / n_tot[i] < ber_floor]
+    return [i for i in active if i < min(below)] if below else active
+
+
+def _numpy_task(k, group, no, batch_size, rule, seed, prior=None, series=None, points=None):
+    """One SNR point of one config group, for core.parallel.run_tasks."""
+    rng = np.random.default_rng(seed)
+    return _numpy_sweep(rng, nphy.SquareQam(k), group, [no], batch_size, rule, prior,
+                        series, points)
+
+
+def _sionna_sweep(tf, mapper, ch, qam, nt, nr, ns, ebnodb2no, snr_db_list, batch_size,
+                  rule, det, ber_floor):
+    """Per-point loop with the Sionna channel. Returns [(n_err, n_bits)] per SNR point."""
+    buf = _buffers(qam, (1, batch_size), nr, ns)
+    counts = []
+    for snr_db in snr_db_list:
+        no = ebnodb2no(snr_db, qam.k, coderate=1.0)
+        no_np = np.full((1, 1, 1), float(no), dtype=np.float32)
+
+        def batch():
+            b, y, h = _sionna_batch(tf, mapper, ch, batch_size, qam.k, nt, ns, no)
+            buf["bits"][0] = b.reshape(batch_size, ns, qam.k)
+            err = _detect_errors(qam, y[None], h[None], no_np, buf, det)
+            return int(err[0]), batch_size * ns * qam.k
+
+        counts.append(run_until(batch, rule))
+        n_err, n_tot = counts[-1]
+        if ber_floor is not None and n_err / n_tot < ber_floor:
+            break
+    return counts
+
+
+def _mrc(y, h, no, buf):
+    """
+    MRC for the repetition baseline: g[r] = sum_t h[r,t],
+    s = sum_r conj(g) y / sum_r |g|^2, no_eff = no / sum_r |g|^2.
+    """
+    g = np.sum(h, axis=-1, out=buf["g"])
+    np.abs(g, out=buf["g2"])
+    np.einsum("...r,...r->...", buf["g2"], buf["g2"], out=buf["den"][..., 0])
+    buf["den"] += np.float32(1e-9)
+    np.conjugate(g, out=g)
+    np.einsum("...r,...r->...", g, y, out=buf["s_hat"][..., 0])
+    np.divide(buf["s_hat"], buf["den"], out=buf["s_hat"])
+    return buf["s_hat"], no / buf["den"]
+
+
+def _linear(y, h, no, detector):
+    """
+    Batched ZF / unbiased MMSE: y [..., nr], h [..., nr, nt] -> (s_hat, no_eff) [..., nt].
+
+    One stacked solve A X = [H^H y | I] gives the estimate and A^-1 together
+    (A = H^H H for ZF, + no I for MMSE). With a = diag(A^-1):
+      ZF:   no_eff = no * a
+      MMSE: mu = 1 - no * a (bias), s_hat /= mu, no_eff = no * a / mu
+    """
+    nt = h.shape[-1]
+    hh = np.conj(np.swapaxes(h, -1, -2))                            # [..., nt, nr]
+    gram = hh @ h                                                   # [..., nt, nt]
+    eye = np.eye(nt, dtype=h.dtype)
+    if detector == "mmse":
+        gram = gram + no[..., None] * eye
+    rhs = np.concatenate([hh @ y[..., None],
+                          np.broadcast_to(eye, gram.shape)], axis=-1)   # [..., nt, 1 + nt]
+    sol = np.linalg.solve(gram, rhs)
+    s_hat = sol[..., 0]
+    a = np.real(np.diagonal(sol[..., 1:], axis1=-2, axis2=-1))      # [..., nt]
+    no_eff = no * a
+    if detector == "mmse":
+        mu = np.maximum(1 - no_eff, 1e-9)
+        s_hat = s_hat / mu
+        no_eff = no_eff / mu
+    return s_hat, no_eff
+
+
+def _kbest(y, h, points, k_best):
+    """
+    Batched K-best detection: y [..., nr], h [..., nr, nt] -> symbol indices [..., nt].
+
+    H = QR, z = Q^H y; layers nt-1 .. 0 are detected in turn, each keeping the
+    k_best partial paths with the smallest accumulated |z - R x|^2.
+    """
+    lead, (nr, nt) = h.shape[:-2], h.shape[-2:]
+    q, r = np.linalg.qr(h.reshape(-1, nr, nt))                      # [N, nr, nt], [N, nt, nt]
+    z = np.einsum("nrt,nr->nt", np.conj(q), y.reshape(-1, nr))      # [N, nt]
+    n, m = z.shape[0], points.shape[0]
+
+    paths = np.zeros((n, 1, 0), dtype=np.intp)                     # [N, P, layers done]
+    metric = np.zeros((n, 1), dtype=np.float32)                     # [N, P]
+    for i in range(nt - 1, -1, -1):
+        # Interference of the already detected layers i+1 .. nt-1
+        interf = np.einsum("nj,npj->np", r[:, i, i + 1:], points[paths])   # [N, P]
+        resid = (z[:, i, None] - interf)[..., None] - r[:, i, i, None, None] * points   # [N, P, M]
+        total = (metric[..., None] + np.abs(resid) ** 2).reshape(n, -1)  # [N, P*M]
+
+        if total.shape[1] > k_best:
+            keep = np.argpartition(total, k_best - 1, axis=1)[:, :k_best]
+        else:
+            keep = np.broadcast_to(np.arange(total.shape[1]), total.shape)
+        parent, sym = keep // m, keep % m
+        paths = np.concatenate([sym[..., None], np.take_along_axis(paths, parent[..., None], axis=1)],
+                               axis=-1)
+        metric = np.take_along_axis(total, keep, axis=1)
+
+    best = np.argmin(metric, axis=1)
+    return paths[np.arange(n), best].reshape(lead + (nt,))
+
+
+def _sionna_batch(tf, mapper, ch, batch_size, k, nt, ns, no):
+    """One Sionna batch -> (bits [B, ns*k], y [B, nr], h [B, nr, nt]) as NumPy."""
+    # ---- Bits -> Symbols ----
+    b = tf.random.uniform([batch_size, ns * k], 0, 2, dtype=tf.int32)
+    x = mapper(b)                                   # [B, ns]
+
+    # Repetition: same symbol on all nt TX antennas
+    x_mimo = tf.tile(x, [1, nt]) if ns == 1 else x  # [B, nt]
+
+    # ---- Channel ----
+    try:
+        y, h = ch(x_mimo, no)       # Sionna 1.x style
+    except TypeError:
+        y, h = ch([x_mimo, no])    # old fallback
+
+    return b.numpy(), y.numpy(), h.numpy()
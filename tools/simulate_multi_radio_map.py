@@ -1,6 +1,15 @@
 import os
 import numpy as np
 import matplotlib.pyplot as plt
+from core.plotting import plot_lock
+from core.pathloss import (
+    grid_axes, combine_tx_maps, sinr_maps,
+    is_sweep, as_sweep, sweep_points, combine_tx_sweep, progressive_map
+)
+from core.buildings import BuildingIndex
+
+# Options only the tiled "max"/"sum" combiner implements, with their defaults
+TILED_OPTIONS = {"sum_method": "linear", "cutoff_m": None, "tile_size": 256}
 
 def simulate_multi_radio_map(
     tx_positions=None,           # list of (x,y,z)
@@ -9,61 +18,84 @@ def simulate_multi_radio_map(
     frequency_hz=3.5e9,
     tx_power_dbm=30.0,
     pathloss_exp=2.2,
-    combine_mode="max",          # "max" or "sum"
+    tx_height=None,              # overrides every TX z
+    buildings=None,              # building footprints + heights (see core.buildings)
+    wall_loss_db=10.0,
+    combine_mode="max",          # "max", "sum" or "sinr"
+    sum_method="linear",         # "linear" or "logsumexp" (combine_mode="sum")
+    cutoff_m=None,               # optional TX range limit (m), skips far tiles
+    tile_size=256,
+    noise_power_dbm=-94.0,       # combine_mode="sinr" (~20 MHz, 7 dB NF)
+    dtype="float64",             # "float64" or "float32"
     out_dir="outputs"
 ):
     """
     Multi-TX analytical radio map.
     If combine_mode="max": strongest TX dominates (coverage map).
     If "sum": power adds in linear domain.
+    If "sinr": serving-cell index, serving power, interference and SINR
+    maps are computed in one pass and saved to kpis["arrays_path"] (.npz);
+    sum_method, cutoff_m and tile_size are not supported there.
+
+    frequency_hz, pathloss_exp, tx_power_dbm and tx_height also accept
+    lists ("max"/"sum" only): the sweep is computed in one broadcast pass
+    per TX and returned as one plot per sweep point plus the stacked array
+    in kpis["sweep_array_path"]. Sweeps sum in linear mW over the whole
+    grid, so sum_method, cutoff_m and tile_size are not supported there.
+
+    buildings adds a per-TX obstacle loss traced through a uniform-grid
+    index of the wall segments.
+
+    Transmitters are folded into a running accumulator one at a time, so
+    memory stays at one grid no matter how many TX positions are given.
 
     Returns JSON with plot path.
     """
+    error = _check_modes(combine_mode, sum_method)
+    if error:
+        return error
     os.makedirs(out_dir, exist_ok=True)
 
     if tx_positions is None:
         tx_positions = [(0,0,10), (60,0,10), (-60,0,10)]
 
-    w, h = area_size
-    xs = np.linspace(-w/2, w/2, rx_grid_size)
-    ys = np.linspace(-h/2, h/2, rx_grid_size)
-
-    c = 3e8
-    lam = c / frequency_hz
-    fspl_const = 20*np.log10(4*np.pi/lam)
-
-    power_maps = []
-    for (tx_x, tx_y, tx_z) in tx_positions:
-        pmap = np.zeros((rx_grid_size, rx_grid_size))
-        for i, x in enumerate(xs):
-            for j, y in enumerate(ys):
-                d = np.sqrt((x-tx_x)**2 + (y-tx_y)**2 + (tx_z)**2) + 1e-6
-                pl_db = fspl_const + 10*pathloss_exp*np.log10(d)
-                rx_pwr_dbm = tx_power_dbm - pl_db
-                pmap[j, i] = rx_pwr_dbm
-        power_maps.append(pmap)
-
-    power_maps = np.stack(power_maps, axis=0)
-
-    if combine_mode == "sum":
-        # sum in linear mW then back to dBm
-        lin = 10 ** (power_maps/10)
-        combined = 10*np.log10(np.sum(lin, axis=0))
-    else:
-        combined = np.max(power_maps, axis=0)
-
-    fig = plt.figure()
-    plt.imshow(combined, origin="lower", extent=[xs[0], xs[-1], ys[0], ys[-1]])
-    plt.colorbar(label="Received Power (dBm)")
-    for (tx_x, tx_y, _) in tx_positions:
-        plt.scatter([tx_x], [tx_y], c="red", marker="^")
-    plt.title(f"Multi-TX Radio Map (combine={combine_mode})")
-    plt.xlabel("X (m)")
-    plt.ylabel("Y (m)")
+    xs, ys = grid_axes(rx_grid_size, area_size)
+    obstacles = BuildingIndex(buildings, wall_loss_db=wall_loss_db) if buildings else None
+
+    if is_sweep(frequency_hz, pathloss_exp, tx_power_dbm, tx_height):
+        if combine_mode not in ("max", "sum"):
+            return {"plots": [], "kpis": {}, "error": f"Parameter sweeps support combine_mode 'max' or 'sum', got: {combine_mode}"}
+        error = _unsupported_options("parameter sweeps", sum_method=sum_method,
+                                     cutoff_m=cutoff_m, tile_size=tile_size)
+        if error:
+            return error
+        heights = None if tx_height is None else as_sweep(tx_height)
+        return _sweep_result(xs, ys, tx_positions, heights, as_sweep(frequency_hz),
+                             as_sweep(pathloss_exp), as_sweep(tx_power_dbm),
+                             rx_grid_size, area_size, combine_mode, dtype, out_dir,
+                             obstacles)
+
+    if tx_height is not None:
+        tx_positions = [(tx[0], tx[1], tx_height) for tx in tx_positions]
+
+    if combine_mode == "sinr":
+        error = _unsupported_options("combine_mode 'sinr'", sum_method=sum_method,
+                                     cutoff_m=cutoff_m, tile_size=tile_size)
+        if error:
+            return error
+        return _sinr_result(xs, ys, tx_positions, rx_grid_size, area_size,
+                            frequency_hz, tx_power_dbm, pathloss_exp,
+                            noise_power_dbm, dtype, out_dir, obstacles)
+
+    combined = combine_tx_maps(
+        xs, ys, tx_positions, frequency_hz, tx_power_dbm, pathloss_exp,
+        combine_mode=combine_mode, sum_method=sum_method, cutoff_m=cutoff_m,
+        tile_size=tile_size, dtype=dtype, obstacles=obstacles
+    )
 
     plot_path = os.path.join(out_dir, "radio_map_multi_tx.png")
-    plt.savefig(plot_path, bbox_inches="tight")
-    plt.close(fig)
+    _plot_combined(combined, xs, ys, tx_positions, plot_path,
+                   f"Multi-TX Radio Map (combine={combine_mode})")
 
     return {
         "plots": [plot_path],
@@ -72,6 +104,209 @@ def simulate_multi_radio_map(
             "rx_grid_size": rx_grid_size,
             "area_size": area_size,
             "frequency_hz": frequency_hz,
-            "combine_mode": combine_mode
+            "combine_mode": combine_mode,
+            "cutoff_m": cutoff_m
+        }
+    }
+
+
+def simulate_multi_radio_map_progressive(
+    tx_positions=None,
+    rx_grid_size=80,
+    area_size=(200, 200),
+    frequency_hz=3.5e9,
+    tx_power_dbm=30.0,
+    pathloss_exp=2.2,
+    tx_height=None,
+    buildings=None,
+    wall_loss_db=10.0,
+    combine_mode="max",
+    sum_method="linear",
+    cutoff_m=None,
+    noise_power_dbm=-94.0,
+    dtype="float64",
+    strides=(16, 4, 1),
+    grad_db=3.0,
+    threshold_dbm=None,
+    complete=True,
+    out_dir="outputs"
+):
+    """
+    Progressive (coarse-to-fine) version of simulate_multi_radio_map.
+    Generator: yields one payload per refinement level ("max"/"sum");
+    "sinr" has no preview and yields the full result once.
+    """
+    error = _check_modes(combine_mode, sum_method)
+    if error:
+        yield error
+        return
+    if combine_mode == "sinr":
+        yield simulate_multi_radio_map(
+            tx_positions=tx_positions, rx_grid_size=rx_grid_size, area_size=area_size,
+            frequency_hz=frequency_hz, tx_power_dbm=tx_power_dbm, pathloss_exp=pathloss_exp,
+            tx_height=tx_height, buildings=buildings, wall_loss_db=wall_loss_db,
+            combine_mode=combine_mode, sum_method=sum_method, cutoff_m=cutoff_m,
+            noise_power_dbm=noise_power_dbm, dtype=dtype, out_dir=out_dir
+        )
+        return
+
+    os.makedirs(out_dir, exist_ok=True)
+
+    if tx_positions is None:
+        tx_positions = [(0,0,10), (60,0,10), (-60,0,10)]
+    if tx_height is not None:
+        tx_positions = [(tx[0], tx[1], tx_height) for tx in tx_positions]
+
+    xs, ys = grid_axes(rx_grid_size, area_size)
+    obstacles = BuildingIndex(buildings, wall_loss_db=wall_loss_db) if buildings else None
+
+    def block_fn(xs_b, ys_b):
+        return combine_tx_maps(xs_b, ys_b, tx_positions, frequency_hz, tx_power_dbm,
+                               pathloss_exp, combine_mode=combine_mode,
+                               sum_method=sum_method, cutoff_m=cutoff_m,
+                               dtype=dtype, obstacles=obstacles)
+
+    levels = progressive_map(xs, ys, block_fn, strides=strides, grad_db=grad_db,
+                             threshold_dbm=threshold_dbm, complete=complete, dtype=dtype)
+    for level, (combined, info) in enumerate(levels):
+        plot_path = os.path.join(out_dir, f"radio_map_multi_tx_progressive_{level}.png")
+        title = f"Multi-TX Radio Map (combine={combine_mode})" if info["final"] \
+            else f"Multi-TX Radio Map (preview, stride {info['stride']})"
+        _plot_combined(combined, xs, ys, tx_positions, plot_path, title)
+
+        yield {
+            "plots": [plot_path],
+            "kpis": {
+                "tx_positions": tx_positions,
+                "rx_grid_size": rx_grid_size,
+                "area_size": area_size,
+                "frequency_hz": frequency_hz,
+                "combine_mode": combine_mode,
+                "level": level,
+                **info
+            }
+        }
+
+
+def _plot_combined(combined, xs, ys, tx_positions, plot_path, title):
+    with plot_lock:
+        fig = plt.figure()
+        plt.imshow(combined, origin="lower", extent=[xs[0], xs[-1], ys[0], ys[-1]])
+        plt.colorbar(label="Received Power (dBm)")
+        for (tx_x, tx_y, _) in tx_positions:
+            plt.scatter([tx_x], [tx_y], c="red", marker="^")
+        plt.title(title)
+        plt.xlabel("X (m)")
+        plt.ylabel("Y (m)")
+        plt.savefig(plot_path, bbox_inches="tight")
+        plt.close(fig)
+
+
+def _check_modes(combine_mode, sum_method):
+    """Error payload for an unknown combine_mode / sum_method, else None."""
+    if combine_mode not in ("max", "sum", "sinr"):
+        return {"plots": [], "kpis": {},
+                "error": f"Unknown combine_mode: {combine_mode} (use 'max', 'sum' or 'sinr')"}
+    if sum_method not in ("linear", "logsumexp"):
+        return {"plots": [], "kpis": {},
+                "error": f"Unknown sum_method: {sum_method} (use 'linear' or 'logsumexp')"}
+    return None
+
+
+def _unsupported_options(what, **options):
+    """Error payload naming the options set away from TILED_OPTIONS, else None."""
+    changed = [name for name, value in options.items() if value != TILED_OPTIONS[name]]
+    if changed:
+        return {"plots": [], "kpis": {}, "error": f"Not supported with {what}: {', '.join(changed)}"}
+    return None
+
+
+def _sinr_result(xs, ys, tx_positions, rx_grid_size, area_size, frequency_hz,
+                 tx_power_dbm, pathloss_exp, noise_power_dbm, dtype, out_dir,
+                 obstacles=None):
+    arrays = sinr_maps(xs, ys, tx_positions, frequency_hz, tx_power_dbm,
+                       pathloss_exp, noise_power_dbm=noise_power_dbm, dtype=dtype,
+                       obstacles=obstacles)
+    extent = [xs[0], xs[-1], ys[0], ys[-1]]
+
+    plots = []
+    for key, label, fname in [
+        ("sinr_db", "SINR (dB)", "radio_map_multi_tx_sinr.png"),
+        ("serving_idx", "Serving TX index", "radio_map_multi_tx_serving.png"),
+    ]:
+        with plot_lock:
+            fig = plt.figure()
+            cmap = "tab20" if key == "serving_idx" else None
+            plt.imshow(arrays[key], origin="lower", extent=extent, cmap=cmap)
+            plt.colorbar(label=label)
+            for (tx_x, tx_y, _) in tx_positions:
+                plt.scatter([tx_x], [tx_y], c="red", marker="^")
+            plt.title(f"Multi-TX {label}")
+            plt.xlabel("X (m)")
+            plt.ylabel("Y (m)")
+
+            plot_path = os.path.join(out_dir, fname)
+            plt.savefig(plot_path, bbox_inches="tight")
+            plt.close(fig)
+        plots.append(plot_path)
+
+    arrays_path = os.path.join(out_dir, "radio_map_multi_tx_sinr.npz")
+    np.savez(arrays_path, **arrays)
+
+    return {
+        "plots": plots,
+        "kpis": {
+            "tx_positions": tx_positions,
+            "rx_grid_size": rx_grid_size,
+            "area_size": area_size,
+            "frequency_hz": frequency_hz,
+            "combine_mode": "sinr",
+            "noise_power_dbm": noise_power_dbm,
+            "sinr_db_median": float(np.median(arrays["sinr_db"])),
+            "arrays_path": arrays_path
+        }
+    }
+
+
+def _sweep_result(xs, ys, tx_positions, heights, frequencies, exps, powers,
+                  rx_grid_size, area_size, combine_mode, dtype, out_dir,
+                  obstacles=None):
+    points = sweep_points(heights or [None], frequencies, exps, powers)
+    stack = combine_tx_sweep(xs, ys, tx_positions, heights, frequencies, exps, powers,
+                             combine_mode=combine_mode, dtype=dtype, obstacles=obstacles)
+    vmin, vmax = float(stack.min()), float(stack.max())
+
+    plots = []
+    for s, pt in enumerate(points):
+        with plot_lock:
+            fig = plt.figure()
+            plt.imshow(stack[s], origin="lower", extent=[xs[0], xs[-1], ys[0], ys[-1]],
+                       vmin=vmin, vmax=vmax)
+            plt.colorbar(label="Received Power (dBm)")
+            for (tx_x, tx_y, _) in tx_positions:
+                plt.scatter([tx_x], [tx_y], c="red", marker="^")
+            height = "" if pt["tx_height"] is None else f", h={pt['tx_height']:g} m"
+            plt.title(f"Multi-TX ({combine_mode}): f={pt['frequency_hz']/1e9:g} GHz, "
+                      f"n={pt['pathloss_exp']:g}, P={pt['tx_power_dbm']:g} dBm{height}")
+            plt.xlabel("X (m)")
+            plt.ylabel("Y (m)")
+
+            plot_path = os.path.join(out_dir, f"radio_map_multi_tx_sweep_{s:03d}.png")
+            plt.savefig(plot_path, bbox_inches="tight")
+            plt.close(fig)
+        plots.append(plot_path)
+
+    array_path = os.path.join(out_dir, "radio_map_multi_tx_sweep.npy")
+    np.save(array_path, stack)
+
+    return {
+        "plots": plots,
+        "kpis": {
+            "tx_positions": tx_positions,
+            "rx_grid_size": rx_grid_size,
+            "area_size": area_size,
+            "combine_mode": combine_mode,
+            "sweep": points,
+            "sweep_array_path": array_path
         }
     }
@@ -1,6 +1,12 @@
 import os
 import numpy as np
 import matplotlib.pyplot as plt
+from core.plotting import plot_lock
+from core.pathloss import (
+    grid_axes, rx_power_dbm, compute_tiled_map,
+    is_sweep, as_sweep, sweep_points, sweep_rx_power_dbm, progressive_map
+)
+from core.buildings import BuildingIndex
 
 def simulate_radio_map(
     tx_pos=(0, 0, 10),
@@ -9,12 +15,33 @@ def simulate_radio_map(
     frequency_hz=3.5e9,
     tx_power_dbm=30.0,
     pathloss_exp=2.2,
+    tx_height=None,            # overrides tx_pos z
+    buildings=None,            # [{"footprint": [[x,y],...], "height": h}, ...] or JSON path
+    wall_loss_db=10.0,         # penetration loss per wall crossed
+    dtype="float64",           # "float64" or "float32" (half the memory)
+    tiled=False,               # stream the map to a .npy on disk (very large grids)
+    tile_size=1024,
+    lod_size=1024,             # PNG resolution in tiled mode
+    array_path=None,           # tiled mode: .npy output (default: out_dir)
     out_dir="outputs"
 ):
     """
     Simple analytical radio map (pathloss-based) if ray tracing not available.
     If you already have Sionna RT pipeline, replace internals.
 
+    frequency_hz, pathloss_exp, tx_power_dbm and tx_height also accept
+    lists: the full cartesian sweep is computed in one broadcast pass over a
+    shared distance grid and returned as one plot per sweep point, with the
+    stacked [n_points, ny, nx] array saved to kpis["sweep_array_path"].
+
+    buildings adds an obstacle term (wall penetration vs. knife-edge
+    diffraction, whichever is smaller) traced through a uniform-grid index
+    of the wall segments (core.buildings).
+
+    tiled=True computes the map tile by tile into a .npy file (peak memory
+    is one band of tile_size rows), plots a downsampled level-of-detail
+    view and returns the array path in kpis["power_map_path"].
+
     Returns:
       {
         "plots": [<png path>],
@@ -24,37 +51,41 @@ def simulate_radio_map(
     os.makedirs(out_dir, exist_ok=True)
 
     tx_x, tx_y, tx_z = tx_pos
-    w, h = area_size
-
-    xs = np.linspace(-w/2, w/2, rx_grid_size)
-    ys = np.linspace(-h/2, h/2, rx_grid_size)
-
-    power_map = np.zeros((rx_grid_size, rx_grid_size))
-
-    # Free-space + pathloss exponent approximation
-    c = 3e8
-    lam = c / frequency_hz
-    fspl_const = 20*np.log10(4*np.pi/lam)
-
-    for i, x in enumerate(xs):
-        for j, y in enumerate(ys):
-            d = np.sqrt((x-tx_x)**2 + (y-tx_y)**2 + (tx_z)**2) + 1e-6
-            pl_db = fspl_const + 10*pathloss_exp*np.log10(d)
-            rx_pwr_dbm = tx_power_dbm - pl_db
-            power_map[j, i] = rx_pwr_dbm
-
-    fig = plt.figure()
-    plt.imshow(power_map, origin="lower", extent=[xs[0], xs[-1], ys[0], ys[-1]])
-    plt.colorbar(label="Received Power (dBm)")
-    plt.scatter([tx_x], [tx_y], c="red", marker="^", label="TX")
-    plt.title("Radio Map (Analytical Pathloss)")
-    plt.xlabel("X (m)")
-    plt.ylabel("Y (m)")
-    plt.legend()
+    xs, ys = grid_axes(rx_grid_size, area_size)
+    obstacles = BuildingIndex(buildings, wall_loss_db=wall_loss_db) if buildings else None
+
+    if is_sweep(frequency_hz, pathloss_exp, tx_power_dbm, tx_height):
+        if tiled:
+            return {"plots": [], "kpis": {}, "error": "Parameter sweeps are not supported in tiled mode"}
+        heights = as_sweep(tx_z if tx_height is None else tx_height)
+        return _sweep_result(xs, ys, tx_pos, heights, as_sweep(frequency_hz),
+                             as_sweep(pathloss_exp), as_sweep(tx_power_dbm),
+                             rx_grid_size, area_size, dtype, out_dir, obstacles)
+
+    if tx_height is not None:
+        tx_z = tx_height
+        tx_pos = (tx_x, tx_y, tx_z)
+
+    extra_kpis = {}
+    if tiled:
+        if array_path is None:
+            array_path = os.path.join(out_dir, "radio_map_single_tx.npy")
+
+        def tile_fn(xs_t, ys_t, out):
+            rx_power_dbm(xs_t, ys_t, tx_pos, frequency_hz, tx_power_dbm,
+                         pathloss_exp, dtype=dtype, out=out, obstacles=obstacles)
+
+        power_map, xs, ys = compute_tiled_map(array_path, xs, ys, tile_fn,
+                                              tile_size=tile_size, lod_size=lod_size,
+                                              dtype=dtype)
+        extra_kpis = {"power_map_path": array_path, "lod_shape": list(power_map.shape)}
+    else:
+        # Free-space + pathloss exponent approximation (vectorized over the grid)
+        power_map = rx_power_dbm(xs, ys, tx_pos, frequency_hz, tx_power_dbm,
+                                 pathloss_exp, dtype=dtype, obstacles=obstacles)
 
     plot_path = os.path.join(out_dir, "radio_map_single_tx.png")
-    plt.savefig(plot_path, bbox_inches="tight")
-    plt.close(fig)
+    _plot_power_map(power_map, xs, ys, tx_pos, plot_path, "Radio Map (Analytical Pathloss)")
 
     return {
         "plots": [plot_path],
@@ -62,6 +93,118 @@ def simulate_radio_map(
             "tx_pos": tx_pos,
             "rx_grid_size": rx_grid_size,
             "area_size": area_size,
-            "frequency_hz": frequency_hz
+            "frequency_hz": frequency_hz,
+            "n_walls": obstacles.n_segments if obstacles else 0,
+            **extra_kpis
+        }
+    }
+
+
+def simulate_radio_map_progressive(
+    tx_pos=(0, 0, 10),
+    rx_grid_size=80,
+    area_size=(200, 200),
+    frequency_hz=3.5e9,
+    tx_power_dbm=30.0,
+    pathloss_exp=2.2,
+    tx_height=None,
+    buildings=None,
+    wall_loss_db=10.0,
+    dtype="float64",
+    strides=(16, 4, 1),        # coarse -> fine sampling strides
+    grad_db=3.0,               # refine blocks whose neighbourhood varies more than this
+    threshold_dbm=None,        # ... or that straddle this coverage threshold
+    complete=True,             # last yield is the exact dense map
+    out_dir="outputs"
+):
+    """
+    Progressive (coarse-to-fine) version of simulate_radio_map for
+    interactive use. Generator: yields the usual {"plots", "kpis"} payload
+    once per refinement level; kpis["final"] marks the last one.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+
+    tx_x, tx_y, tx_z = tx_pos
+    if tx_height is not None:
+        tx_pos = (tx_x, tx_y, tx_height)
+    xs, ys = grid_axes(rx_grid_size, area_size)
+    obstacles = BuildingIndex(buildings, wall_loss_db=wall_loss_db) if buildings else None
+
+    def block_fn(xs_b, ys_b):
+        return rx_power_dbm(xs_b, ys_b, tx_pos, frequency_hz, tx_power_dbm,
+                            pathloss_exp, dtype=dtype, obstacles=obstacles)
+
+    levels = progressive_map(xs, ys, block_fn, strides=strides, grad_db=grad_db,
+                             threshold_dbm=threshold_dbm, complete=complete, dtype=dtype)
+    for level, (power_map, info) in enumerate(levels):
+        plot_path = os.path.join(out_dir, f"radio_map_single_tx_progressive_{level}.png")
+        title = "Radio Map (Analytical Pathloss)" if info["final"] \
+            else f"Radio Map (preview, stride {info['stride']})"
+        _plot_power_map(power_map, xs, ys, tx_pos, plot_path, title)
+
+        yield {
+            "plots": [plot_path],
+            "kpis": {
+                "tx_pos": tx_pos,
+                "rx_grid_size": rx_grid_size,
+                "area_size": area_size,
+                "frequency_hz": frequency_hz,
+                "level": level,
+                **info
+            }
+        }
+
+
+def _plot_power_map(power_map, xs, ys, tx_pos, plot_path, title):
+    with plot_lock:
+        fig = plt.figure()
+        plt.imshow(power_map, origin="lower", extent=[xs[0], xs[-1], ys[0], ys[-1]])
+        plt.colorbar(label="Received Power (dBm)")
+        plt.scatter([tx_pos[0]], [tx_pos[1]], c="red", marker="^", label="TX")
+        plt.title(title)
+        plt.xlabel("X (m)")
+        plt.ylabel("Y (m)")
+        plt.legend()
+        plt.savefig(plot_path, bbox_inches="tight")
+        plt.close(fig)
+
+
+def _sweep_result(xs, ys, tx_pos, heights, frequencies, exps, powers,
+                  rx_grid_size, area_size, dtype, out_dir, obstacles=None):
+    points = sweep_points(heights, frequencies, exps, powers)
+    stack = sweep_rx_power_dbm(xs, ys, tx_pos, heights, frequencies, exps, powers,
+                               dtype=dtype, obstacles=obstacles)
+    vmin, vmax = float(stack.min()), float(stack.max())
+
+    plots = []
+    for s, pt in enumerate(points):
+        with plot_lock:
+            fig = plt.figure()
+            plt.imshow(stack[s], origin="lower", extent=[xs[0], xs[-1], ys[0], ys[-1]],
+                       vmin=vmin, vmax=vmax)
+            plt.colorbar(label="Received Power (dBm)")
+            plt.scatter([tx_pos[0]], [tx_pos[1]], c="red", marker="^", label="TX")
+            plt.title(f"Radio Map: f={pt['frequency_hz']/1e9:g} GHz, n={pt['pathloss_exp']:g}, "
+                      f"P={pt['tx_power_dbm']:g} dBm, h={pt['tx_height']:g} m")
+            plt.xlabel("X (m)")
+            plt.ylabel("Y (m)")
+            plt.legend()
+
+            plot_path = os.path.join(out_dir, f"radio_map_single_tx_sweep_{s:03d}.png")
+            plt.savefig(plot_path, bbox_inches="tight")
+            plt.close(fig)
+        plots.append(plot_path)
+
+    array_path = os.path.join(out_dir, "radio_map_single_tx_sweep.npy")
+    np.save(array_path, stack)
+
+    return {
+        "plots": plots,
+        "kpis": {
+            "tx_pos": tx_pos,
+            "rx_grid_size": rx_grid_size,
+            "area_size": area_size,
+            "sweep": points,
+            "sweep_array_path": array_path
         }
     }
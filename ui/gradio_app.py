@@ -1,23 +1,60 @@
 import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
+import threading
+
 import gradio as gr
 from main import TelecomMultiAgentAssistant
+from core.jobs import TERMINAL, progress_text
+
+_assistant = None
+_assistant_lock = threading.Lock()
 
-assistant = TelecomMultiAgentAssistant()
+def get_assistant():
+    # Built on the first request, not at import; its worker pool spawns lazily too.
+    # Shared by all users, so identical concurrent requests are coalesced.
+    global _assistant
+    with _assistant_lock:
+        if _assistant is None:
+            _assistant = TelecomMultiAgentAssistant(use_worker_pool=True, use_result_cache=True,
+                                                    use_point_store=True, coalesce=True)
+    return _assistant
 
 def run_agent(prompt):
-    summary, payload = assistant.chat(prompt)
-    plots = payload.get("plots", [])
-    return summary, plots
+    # Runs as a background job; the generator streams its progress and the
+    # coarse-to-fine radio-map previews. Cancel (or closing the tab) cancels it.
+    assistant = get_assistant()
+    job_id = assistant.submit(prompt)
+    try:
+        for status in assistant.watch(job_id):
+            partial = assistant.jobs.get(job_id).partial
+            plots = partial[1].get("plots", []) if partial else []
+            if status["status"] in TERMINAL:
+                break
+            yield progress_text(status), plots
+        result = assistant.job_result(job_id)
+        if status["status"] == "done" and result is not None:
+            summary, payload = result
+            yield summary, payload.get("plots", [])
+        else:
+            yield progress_text(status), plots
+    finally:
+        assistant.cancel(job_id)        # no-op once the job has finished or been pruned
 
 with gr.Blocks() as demo:
     gr.Markdown("# Multi-Agent Telecom Simulation Assistant (Sionna + MCP)")
     inp = gr.Textbox(label="Enter telecom simulation request")
     out_summary = gr.Textbox(label="Agent Summary")
     out_gallery = gr.Gallery(label="Plots", columns=2)
-    btn = gr.Button("Run")
+    with gr.Row():
+        btn = gr.Button("Run")
+        stop = gr.Button("Cancel")
 
-    btn.click(run_agent, inp, [out_summary, out_gallery])
+    run = btn.click(run_agent, inp, [out_summary, out_gallery])
+    stop.click(None, None, None, cancels=[run])
 
-demo.launch()
+# Guarded: spawned sweep workers (core.parallel) re-import the main module
+if __name__ == "__main__":
+    from core.local_tools import LOCAL_STREAM_TOOL_REGISTRY
+    LOCAL_STREAM_TOOL_REGISTRY.prefetch()   # radio-map previews run in this process
+    demo.launch()